@@ -0,0 +1,143 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+from urllib.parse import parse_qsl
+
+# Fixtures are the recorded responses of a platform, one JSON object per line in <directory>/<platform>.jsonl:
+#   {"method": ..., "url": ..., "body": hash of the request body or null, "status": ..., "headers": {...},
+#    "content": ..., "encoding": "text" or "base64"}
+#
+# Credentials never end up in fixtures: request headers are not recorded at all, request bodies only as a hash,
+# and token-like fields in response bodies are replaced.
+
+# Response headers the platforms (and the SDKs they use) look at
+kept_headers = ['content-type', 'link', 'last-modified', 'etag']
+
+# Not just any field ending in 'token': pagination tokens (Zoom's next_page_token) are needed to replay
+secret_fields = re.compile(r'^(access_token|refresh_token|id_token|token|secret|client_secret|password|api_key)$',
+                           re.IGNORECASE)
+
+
+def parse_body(body):
+    # Request bodies as sent over the wire: JSON (GraphQL) or form encoded (OAuth)
+    if not body:
+        return None
+
+    try:
+        return json.loads(body)
+    except ValueError:
+        return dict(parse_qsl(body.decode('utf-8')))
+
+
+def body_hash(data):
+    # Tells apart requests to the same url with a different body, e.g. GraphQL queries
+    if data is None:
+        return None
+
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def redact(data):
+    if isinstance(data, dict):
+        return {key: 'redacted' if secret_fields.search(key) and isinstance(value, str) else redact(value)
+                for key, value in data.items()}
+    elif isinstance(data, list):
+        return [redact(value) for value in data]
+
+    return data
+
+
+def redact_config(platform, section):
+    # A platform's configuration, as needed to replay its fixtures: everything but the credentials
+    section = redact(section)
+
+    # Github orgs are configured as {org: token}
+    if platform == 'Github' and 'orgs' in section:
+        section['orgs'] = [{org: 'redacted' for org in dict_org} for dict_org in section['orgs']]
+
+    return section
+
+
+class FixtureRecorder:
+    # To be set as Platform.recorder; appends every response a platform receives to its fixture file
+    def __init__(self, directory):
+        self.__directory = directory
+        self.__files = dict()
+        self.__lock = threading.Lock()
+        self.__count = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, platform, method, url, data, response):
+        content = response.content
+        try:
+            content = json.dumps(redact(json.loads(content)))
+            encoding = 'text'
+        except ValueError:
+            try:
+                content = content.decode('utf-8')
+                encoding = 'text'
+            except UnicodeDecodeError:
+                content = base64.b64encode(content).decode('ascii')
+                encoding = 'base64'
+
+        entry = {
+            'method': method,
+            'url': url,
+            'body': body_hash(data),
+            'status': response.status_code,
+            'headers': {key: value for key, value in response.headers.items() if key.lower() in kept_headers},
+            'content': content,
+            'encoding': encoding
+        }
+
+        with self.__lock:
+            if platform not in self.__files:
+                self.__files[platform] = open(os.path.join(self.__directory, f'{platform}.jsonl'), 'w')
+
+            self.__files[platform].write(json.dumps(entry) + '\n')
+            self.__count += 1
+
+    def get_count(self):
+        return self.__count
+
+    def close(self):
+        with self.__lock:
+            for f in self.__files.values():
+                f.close()
+            self.__files.clear()
+
+
+class FixtureStore:
+    # Serves the fixtures of a platform to the ReplayServer. A request recorded several times
+    # (e.g. a page that was fetched twice) gets the recorded responses in turn.
+    def __init__(self, directory, platform):
+        self.__responses = dict()
+        self.__served = dict()
+        self.__lock = threading.Lock()
+
+        with open(os.path.join(directory, f'{platform}.jsonl'), 'r') as f:
+            for line in f:
+                entry = json.loads(line)
+                key = (entry['method'], entry['url'], entry['body'])
+                self.__responses.setdefault(key, list()).append(entry)
+
+    def respond(self, method, url, data):
+        key = (method, url, body_hash(data))
+        if key not in self.__responses:
+            return None
+
+        with self.__lock:
+            lst_entries = self.__responses[key]
+            entry = lst_entries[self.__served.get(key, 0) % len(lst_entries)]
+            self.__served[key] = self.__served.get(key, 0) + 1
+
+        if entry['encoding'] == 'base64':
+            content = base64.b64decode(entry['content'])
+        else:
+            content = entry['content'].encode('utf-8')
+
+        return entry['status'], entry['headers'], content
@@ -0,0 +1,86 @@
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Measures the cold start cost of importing the platforms package, and of every platform on top of it.
+# Every measurement runs in a fresh interpreter, so nothing is imported yet.
+#
+# Run from the root of the repository:
+#   python benchmarks/import_time.py [--repeat 5] [--json import_times.json]
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Prints the seconds it took to import the package, and then the given platform (if any)
+snippet = """
+import time
+start = time.perf_counter()
+import platforms
+package_done = time.perf_counter()
+if '{platform}':
+    platforms.get_platform('{platform}')
+print(package_done - start, time.perf_counter() - package_done)
+"""
+
+
+def measure(platform, repeat):
+    lst_package = list()
+    lst_platform = list()
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', snippet.format(platform=platform)],
+                                cwd=root_dir, capture_output=True, text=True, check=True)
+        package_time, platform_time = [float(value) for value in result.stdout.split()]
+        lst_package.append(package_time)
+        lst_platform.append(platform_time)
+
+    return statistics.median(lst_package), statistics.median(lst_platform)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Measure the import time of Inventoryst and its platforms')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='runs per measurement; the median is reported')
+    arg_parser.add_argument('--json', help='append the results to this JSON file, to track them over releases')
+    args = arg_parser.parse_args()
+
+    sys.path.insert(0, root_dir)
+    from platforms import platform_names
+
+    package_time, _ = measure('', args.repeat)
+    print(f"{'platforms (package)':<24}{package_time * 1000:>10.1f} ms")
+
+    dict_results = {'package': package_time, 'platforms': dict()}
+    for platform in platform_names:
+        try:
+            _, platform_time = measure(platform, args.repeat)
+        except subprocess.CalledProcessError as e:
+            # Usually a missing dependency; report it, and carry on with the others
+            print(f"{platform:<24}{'failed':>10}    {e.stderr.strip().splitlines()[-1]}")
+            continue
+
+        dict_results['platforms'][platform] = platform_time
+        print(f"{platform:<24}{platform_time * 1000:>10.1f} ms")
+
+    if args.json:
+        lst_history = list()
+        if os.path.exists(args.json):
+            with open(args.json, 'r') as f:
+                lst_history = json.load(f)
+
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root_dir,
+                                capture_output=True, text=True).stdout.strip()
+        lst_history.append({
+            'date': datetime.datetime.now(datetime.UTC).isoformat(),
+            'commit': commit,
+            'python': sys.version.split()[0],
+            'results': dict_results
+        })
+
+        with open(args.json, 'w') as f:
+            json.dump(lst_history, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
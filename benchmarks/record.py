@@ -0,0 +1,83 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import yaml
+
+from fixtures import FixtureRecorder, redact_config
+
+# Records the API responses of live platform runs as fixtures, for run.py to replay offline.
+#
+# Uses the credentials in inventoryst.yaml, but none of its directories: pages, state and cache go
+# to a temporary directory, so the vault is left alone. Only requests made through Platform's HTTP helpers
+# are recorded; platforms that talk to their API through an SDK (Cloudflare, Zulip, most of Github)
+# or not over HTTP at all (MySQL) can't be replayed from fixtures.
+#
+# Fixtures hold real data of your accounts (names, e-mail addresses, etc.). Keep them out of version control.
+#
+# Run from the root of the repository:
+#   python benchmarks/record.py --platform DockerHub [--platform ...] [--fixtures benchmarks/fixtures]
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Record API responses of Inventoryst platforms as fixtures')
+    arg_parser.add_argument('--platform', action='append', required=True, help='platform to record (repeatable)')
+    arg_parser.add_argument('--fixtures', default=os.path.join(root_dir, 'benchmarks', 'fixtures'),
+                            help='directory to write the fixtures to')
+    arg_parser.add_argument('--config', default='inventoryst.yaml', help='configuration with the credentials')
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    sys.path.insert(0, root_dir)
+    from platforms import Config, Platform, get_platform
+
+    with open(args.config, 'r') as f:
+        dict_config = yaml.safe_load(f)
+
+    work_dir = tempfile.mkdtemp(prefix='inventoryst-record-')
+    dict_config['general'].update({
+        'output_directory': os.path.join(work_dir, 'output'),
+        'state_directory': os.path.join(work_dir, 'state'),
+        'inventories': args.platform,
+        'cache': {'enabled': False}
+    })
+    dict_config['general'].pop('metrics', None)
+
+    os.makedirs(dict_config['general']['output_directory'])
+
+    config_path = os.path.join(work_dir, 'inventoryst.yaml')
+    with open(config_path, 'w') as f:
+        yaml.safe_dump(dict_config, f)
+
+    Config.yaml_file = config_path
+    Platform.cache_enabled = False
+
+    recorder = FixtureRecorder(args.fixtures)
+    Platform.recorder = recorder
+    try:
+        for platform in args.platform:
+            count = recorder.get_count()
+            get_platform(platform)().inventorize()
+
+            if recorder.get_count() == count:
+                logging.warning(f'No requests of {platform} went through Platform; it can not be replayed')
+                continue
+
+            # What run.py needs to run the platform again, without the credentials
+            with open(os.path.join(args.fixtures, f'{platform}.config.json'), 'w') as f:
+                json.dump(redact_config(platform, dict_config[platform.lower()]), f, indent=2)
+
+            logging.info(f'Recorded {recorder.get_count() - count} responses of {platform}')
+    finally:
+        recorder.close()
+
+    logging.info(f'Pages of the recorded runs are in {work_dir}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from fixtures import parse_body
+
+
+def rewrite_url(base_url, url):
+    # https://<host>/<path> becomes <base_url>/<host>/<path>
+    parts = urlsplit(url)
+    return f"{base_url}/{parts.netloc}{parts.path}{'?' + parts.query if parts.query else ''}"
+
+
+class ReplayServer:
+    # Stands in for the APIs of the platforms, on localhost. Responses come from a source with a
+    # respond(method, url, data) method, returning (status, headers, content) or None: recorded
+    # fixtures (FixtureStore) or synthetic data (synthetic.py).
+    #
+    # A request for https://<host>/<path> is sent to http://127.0.0.1:<port>/<host>/<path> instead (see rewrite()).
+    # Every response is delayed by latency +/- jitter milliseconds, as a real API would.
+    def __init__(self, source, latency=0, jitter=0, port=0):
+        self.__source = source
+        self.__latency = latency
+        self.__jitter = jitter
+
+        self.__requests = 0
+        self.__misses = 0
+        self.__lock = threading.Lock()
+
+        self.__server = ThreadingHTTPServer(('127.0.0.1', port), self.__get_handler())
+        self.__server.daemon_threads = True
+        self.__thread = None
+
+        self.base_url = f'http://127.0.0.1:{self.__server.server_address[1]}'
+
+    def rewrite(self, url):
+        # To be set as Platform.url_rewrite
+        return rewrite_url(self.base_url, url)
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name='replay', daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def get_stats(self):
+        with self.__lock:
+            return {'requests': self.__requests, 'misses': self.__misses}
+
+    def reset_stats(self):
+        with self.__lock:
+            self.__requests = 0
+            self.__misses = 0
+
+    def __delay(self):
+        delay = self.__latency + random.uniform(-self.__jitter, self.__jitter)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def respond(self, method, path, body):
+        # path is /<host>/<path>, as made by rewrite()
+        self.__delay()
+
+        host, _, rest = path.lstrip('/').partition('/')
+        url = f'https://{host}/{rest}'
+
+        response = self.__source.respond(method, url, parse_body(body))
+
+        with self.__lock:
+            self.__requests += 1
+            if response is None:
+                self.__misses += 1
+
+        if response is None:
+            logging.getLogger().warning(f'No response for {method} {url}')
+            return 404, {'Content-Type': 'application/json'}, b'{"message": "Not Found"}'
+
+        status, headers, content = response
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+
+        # Urls pointing back to the API (pagination links, PyGithub's object urls) should lead here as well
+        original = f'https://{host}'.encode('utf-8')
+        replaced = f'{self.base_url}/{host}'.encode('utf-8')
+        content = content.replace(original, replaced)
+        headers = {key: value.replace(original.decode('utf-8'), replaced.decode('utf-8'))
+                   for key, value in headers.items()}
+
+        return status, headers, content
+
+    def __get_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def __handle(self, method):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length) if length else None
+
+                status, headers, content = server.respond(method, self.path, body)
+
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def do_GET(self):
+                self.__handle('GET')
+
+            def do_POST(self):
+                self.__handle('POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,224 @@
+import argparse
+import datetime
+import functools
+import json
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import yaml
+
+from fixtures import FixtureStore
+from replay import ReplayServer, rewrite_url
+from synthetic import SyntheticGithub, SyntheticZoom
+
+# Runs platforms offline, against a local ReplayServer, and reports per run: wall time, API calls,
+# peak memory and pages written. Github and Zoom run on synthetic data; any platform recorded
+# with record.py can be replayed from its fixtures.
+#
+# Every run is a fresh interpreter (so peak memory is the run's own), with its own output and state directory.
+# With --incremental, runs share them, so the first run is cold and the others show the incremental path.
+#
+# Run from the root of the repository:
+#   python benchmarks/run.py [--platform Github] [--fixtures benchmarks/fixtures] [--latency 50] [--jitter 10]
+#                            [--repeat 3] [--incremental] [--rate-limits] [--json benchmarks.json]
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_sources(args):
+    # {platform: (source, config section)}
+    dict_sources = dict()
+
+    github = SyntheticGithub(repos=args.github_repos, members=args.github_members, seed=args.seed)
+    dict_sources['Github'] = (github, github.get_config())
+
+    zoom = SyntheticZoom(users=args.zoom_users, months=args.zoom_months, seed=args.seed)
+    dict_sources['Zoom'] = (zoom, zoom.get_config())
+
+    # Recorded fixtures take precedence over synthetic data
+    if args.fixtures:
+        for file in sorted(os.listdir(args.fixtures)):
+            if not file.endswith('.config.json'):
+                continue
+
+            platform = file[:-len('.config.json')]
+            with open(os.path.join(args.fixtures, file), 'r') as f:
+                section = json.load(f)
+
+            dict_sources[platform] = (FixtureStore(args.fixtures, platform), section)
+
+    return dict_sources
+
+
+def write_config(path, work_dir, platform, section):
+    dict_config = {
+        'general': {
+            'stage': 'prod',
+            'output_directory': os.path.join(work_dir, 'output'),
+            'state_directory': os.path.join(work_dir, 'state'),
+            'inventories': [platform],
+            'cache': {'enabled': False}
+        },
+        platform.lower(): section
+    }
+
+    with open(path, 'w') as f:
+        yaml.safe_dump(dict_config, f)
+
+
+def run_platform(platform, config_path, base_url, rate_limits):
+    # Runs in a fresh interpreter; see worker()
+    spec = {'platform': platform, 'config': config_path, 'base_url': base_url, 'rate_limits': rate_limits}
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', json.dumps(spec)],
+                            cwd=root_dir, capture_output=True, text=True)
+
+    if result.returncode != 0 or not result.stdout.strip():
+        return {'success': False, 'error': result.stderr.strip().splitlines()[-1] if result.stderr else 'no output'}
+
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def worker(spec):
+    sys.path.insert(0, root_dir)
+    from platforms import Config, Platform, get_platform
+
+    Config.yaml_file = spec['config']
+    Platform.url_rewrite = functools.partial(rewrite_url, spec['base_url'])
+    Platform.cache_enabled = False
+
+    platform_class = get_platform(spec['platform'])
+
+    # By default, the replay server is not throttled; what is measured is the platform itself
+    if not spec['rate_limits']:
+        platform_class._rate_limits = dict()
+
+    obj_platform = None
+    success = True
+    error = None
+    start = time.perf_counter()
+    try:
+        obj_platform = platform_class()
+        obj_platform.inventorize()
+    except Exception as e:
+        logging.exception(f'{spec["platform"]} failed')
+        success = False
+        error = str(e)
+
+    dict_result = {
+        'success': success,
+        'error': error,
+        'wall_time': round(time.perf_counter() - start, 3),
+        # Kilobytes on Linux
+        'peak_memory': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    }
+
+    if obj_platform:
+        dict_result['api_calls'] = obj_platform.get_api_calls()
+        dict_result['pages_written'] = obj_platform.get_changed_page_count()
+        dict_result['bytes_written'] = obj_platform.get_bytes_written()
+        dict_result['phases'] = obj_platform.get_metrics()['phases']
+
+    print(json.dumps(dict_result))
+
+
+def print_result(platform, run, dict_result):
+    if not dict_result['success']:
+        print(f"{platform:<14}{run:>4}    failed: {dict_result['error']}")
+        return
+
+    print(f"{platform:<14}{run:>4}{dict_result['wall_time']:>10.2f} s{dict_result['api_calls']:>10}"
+          f"{dict_result['requests']:>10}{dict_result['misses']:>8}"
+          f"{dict_result['peak_memory'] / 1024 ** 2:>10.1f} MB{dict_result['pages_written']:>8}"
+          f"{dict_result['bytes_written'] / 1024 ** 2:>10.1f} MB")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark Inventoryst platforms offline')
+    arg_parser.add_argument('--platform', action='append', help='platform to run (repeatable); default: all available')
+    arg_parser.add_argument('--fixtures', help='directory with fixtures recorded by record.py')
+    arg_parser.add_argument('--latency', type=float, default=0, help='milliseconds added to every response')
+    arg_parser.add_argument('--jitter', type=float, default=0, help='random +/- milliseconds on the latency')
+    arg_parser.add_argument('--repeat', type=int, default=1, help='runs per platform')
+    arg_parser.add_argument('--incremental', action='store_true', help='keep output and state between runs')
+    arg_parser.add_argument('--rate-limits', action='store_true', help='apply the rate limits of the real APIs')
+    arg_parser.add_argument('--seed', type=int, default=1, help='seed of the synthetic data')
+    arg_parser.add_argument('--github-repos', type=int, default=5000)
+    arg_parser.add_argument('--github-members', type=int, default=300)
+    arg_parser.add_argument('--zoom-users', type=int, default=500)
+    arg_parser.add_argument('--zoom-months', type=int, default=60)
+    arg_parser.add_argument('--keep', action='store_true', help='keep the output of the runs')
+    arg_parser.add_argument('--json', help='append the results to this JSON file, to track them over releases')
+    arg_parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.worker:
+        worker(json.loads(args.worker))
+        return
+
+    logging.basicConfig(level=logging.ERROR)
+
+    dict_sources = get_sources(args)
+    platforms = args.platform or list(dict_sources)
+    for platform in platforms:
+        if platform not in dict_sources:
+            arg_parser.error(f"No synthetic data or fixtures for '{platform}'")
+
+    print(f"{'platform':<14}{'run':>4}{'wall':>12}{'api calls':>10}{'requests':>10}{'misses':>8}"
+          f"{'peak mem':>13}{'pages':>8}{'written':>13}")
+
+    dict_results = dict()
+    for platform in platforms:
+        source, section = dict_sources[platform]
+        server = ReplayServer(source, latency=args.latency, jitter=args.jitter)
+        server.start()
+
+        work_dir = tempfile.mkdtemp(prefix=f'inventoryst-{platform.lower()}-')
+        dict_results[platform] = list()
+        try:
+            for run in range(1, args.repeat + 1):
+                run_dir = work_dir if args.incremental else os.path.join(work_dir, f'run-{run}')
+                os.makedirs(os.path.join(run_dir, 'output'), exist_ok=True)
+
+                config_path = os.path.join(run_dir, 'inventoryst.yaml')
+                write_config(config_path, run_dir, platform, section)
+
+                server.reset_stats()
+                dict_result = run_platform(platform, config_path, server.base_url, args.rate_limits)
+                dict_result.update(server.get_stats())
+
+                print_result(platform, run, dict_result)
+                dict_results[platform].append(dict_result)
+        finally:
+            server.stop()
+            if args.keep:
+                print(f'Output of {platform} kept in {work_dir}')
+            else:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        lst_history = list()
+        if os.path.exists(args.json):
+            with open(args.json, 'r') as f:
+                lst_history = json.load(f)
+
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root_dir,
+                                capture_output=True, text=True).stdout.strip()
+        lst_history.append({
+            'date': datetime.datetime.now(datetime.UTC).isoformat(),
+            'commit': commit,
+            'python': sys.version.split()[0],
+            'options': {key: value for key, value in vars(args).items() if key not in ['json', 'worker']},
+            'results': dict_results
+        })
+
+        with open(args.json, 'w') as f:
+            json.dump(lst_history, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
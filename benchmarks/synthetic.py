@@ -0,0 +1,419 @@
+import datetime
+import json
+import random
+import re
+import threading
+from dateutil.relativedelta import relativedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Synthetic API data, at a size that is impractical (or impossible) to record: a Github organization with
+# thousands of repositories, a Zoom account with hundreds of users and years of recordings.
+#
+# Every source answers respond(method, url, data) for the ReplayServer, and provides the configuration
+# section its platform needs. All data derives from the seed: the same seed gives the same responses,
+# so successive runs (and incremental runs) see the same account.
+
+
+def json_response(data, headers=None, status=200):
+    dict_headers = {'Content-Type': 'application/json'}
+    if headers:
+        dict_headers.update(headers)
+
+    return status, dict_headers, json.dumps(data)
+
+
+def get_query(url):
+    return dict(parse_qsl(urlsplit(url).query))
+
+
+class SyntheticGithub:
+    # The REST endpoints PyGithub uses, and the GraphQL queries for repositories and user activity
+    api = 'https://api.github.com'
+
+    # Fields of a repository that are fetched per batch of repositories, and how the query names them
+    __repo_details = {
+        'defaultBranchRef': 'history',
+        'releases': 'releases',
+        'vulnerabilityAlerts': 'vulnerabilityAlerts'
+    }
+
+    def __init__(self, org='synthetic-org', repos=5000, members=300, collaborators=50, teams=40, seed=1,
+                 rate_limit=10 ** 6):
+        self.__org = org
+        self.__repo_count = repos
+        self.__member_count = members
+        self.__collaborator_count = collaborators
+        self.__team_count = teams
+        self.__seed = seed
+
+        # Fixed, so pages don't change between runs
+        self.__reference = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+        # Requests left per resource, in a window of an hour, as reported in the X-RateLimit headers
+        self.__rate_limit = rate_limit
+        self.__remaining = {'core': rate_limit, 'graphql': rate_limit}
+        self.__reset = int(datetime.datetime.now().timestamp()) + 3600
+
+        # Repositories whose contributor statistics have been asked for
+        self.__stats_computed = set()
+        self.__lock = threading.Lock()
+
+    def get_config(self):
+        return {'orgs': [{self.__org: 'synthetic'}], 'stale_years': 2}
+
+    def __random(self, kind, index):
+        return random.Random(f'{self.__seed}:{kind}:{index}')
+
+    def __repo(self, index):
+        rnd = self.__random('repo', index)
+        name = f'repo-{index:05d}'
+
+        # Most recently pushed first, as the query orders them
+        pushed_at = self.__reference - datetime.timedelta(hours=index * 6)
+        empty = rnd.random() < 0.05
+        alerts = rnd.choice([0, 0, 0, 1, 2, 5]) if not empty else 0
+
+        return {
+            'name': name,
+            'nameWithOwner': f'{self.__org}/{name}',
+            'url': f'https://github.com/{self.__org}/{name}',
+            'description': f'Synthetic repository {index}' if rnd.random() < 0.8 else None,
+            'isArchived': rnd.random() < 0.1,
+            'visibility': rnd.choice(['PUBLIC', 'PUBLIC', 'PRIVATE', 'INTERNAL']),
+            'createdAt': (pushed_at - datetime.timedelta(days=rnd.randint(0, 2000))).isoformat(),
+            'pushedAt': pushed_at.isoformat(),
+            'diskUsage': 0 if empty else rnd.randint(1, 500000),
+            'defaultBranchRef': None if empty else {
+                'name': 'main',
+                'target': {'history': {'totalCount': rnd.randint(1, 20000)}}
+            },
+            'releases': {'totalCount': 0 if empty else rnd.randint(0, 50)},
+            'hasVulnerabilityAlertsEnabled': rnd.random() < 0.7,
+            'vulnerabilityAlerts': {'nodes': [{
+                'number': number + 1,
+                'securityVulnerability': {
+                    'severity': rnd.choice(['LOW', 'MODERATE', 'HIGH', 'CRITICAL']),
+                    'package': {'name': f'package-{rnd.randint(1, 200)}'}
+                }
+            } for number in range(alerts)]},
+            'tags': {'totalCount': 0 if empty else rnd.randint(0, 200)},
+            'branches': {'totalCount': 0 if empty else rnd.randint(1, 40)},
+            'pullRequests': {'totalCount': 0 if empty else rnd.choice([0, 0, 1, 3, 12])}
+        }
+
+    def __user(self, login):
+        return {
+            'login': login,
+            'id': self.__random('id', login).randint(1, 10 ** 8),
+            'url': f'{self.api}/users/{login}',
+            'html_url': f'https://github.com/{login}',
+            'avatar_url': f'https://avatars.githubusercontent.com/{login}',
+            'type': 'User'
+        }
+
+    def __members(self):
+        return [f'member-{index:04d}' for index in range(self.__member_count)]
+
+    def __collaborators(self):
+        return [f'collaborator-{index:04d}' for index in range(self.__collaborator_count)]
+
+    def __no2fa(self, login):
+        return self.__random('2fa', login).random() < 0.1
+
+    def __team(self, index):
+        slug = f'team-{index:03d}'
+        return {
+            'id': index + 1,
+            'name': f'Team {index}',
+            'slug': slug,
+            'url': f'{self.api}/orgs/{self.__org}/teams/{slug}',
+            'html_url': f'https://github.com/orgs/{self.__org}/teams/{slug}',
+            'description': f'Synthetic team {index}',
+            'privacy': 'closed',
+            'permission': 'pull'
+        }
+
+    def __page(self, url, lst_items, headers=None):
+        # Github style pagination: page/per_page query params, and a Link header to the next page
+        query = get_query(url)
+        per_page = int(query.get('per_page', 30))
+        page = int(query.get('page', 1))
+
+        headers = dict(headers) if headers else dict()
+        if page * per_page < len(lst_items):
+            query['page'] = page + 1
+            headers['Link'] = f'<{self.api}{urlsplit(url).path}?{urlencode(query)}>; rel="next"'
+
+        return json_response(lst_items[(page - 1) * per_page:page * per_page], headers)
+
+    def __contributions(self, login, since):
+        # The contribution calendar of a user, from 'since' until today, a week at a time
+        rnd = self.__random('activity', login)
+        today = datetime.date.today()
+        last_active = today - datetime.timedelta(days=rnd.randint(0, 500))
+
+        day = datetime.date.fromisoformat(since[:10])
+        lst_weeks = list()
+        while day <= today:
+            if not lst_weeks or len(lst_weeks[-1]['contributionDays']) == 7:
+                lst_weeks.append({'contributionDays': list()})
+
+            count = rnd.randint(1, 10) if day == last_active or (day < last_active and rnd.random() < 0.2) else 0
+            lst_weeks[-1]['contributionDays'].append({'date': day.isoformat(), 'contributionCount': count})
+            day += datetime.timedelta(days=1)
+
+        return {'contributionsCollection': {'contributionCalendar': {'weeks': lst_weeks}}}
+
+    @staticmethod
+    def __alerts(dict_repo, query, after):
+        # A page of the alerts of a repository, as big as the query asks for
+        first = int(re.search(r'vulnerabilityAlerts\([^)]*first: (\d+)', query).group(1))
+        start = int(after) if after else 0
+        lst_nodes = dict_repo['vulnerabilityAlerts']['nodes']
+
+        return {
+            'pageInfo': {'hasNextPage': start + first < len(lst_nodes), 'endCursor': str(start + first)},
+            'nodes': lst_nodes[start:start + first]
+        }
+
+    def __graphql(self, data):
+        query = data['query']
+        variables = data['variables']
+
+        if 'repositories(' in query:
+            start = int(variables['after']) if variables.get('after') else 0
+            end = min(start + variables['first'], self.__repo_count)
+
+            lst_nodes = list()
+            for index in range(start, end):
+                dict_repo = self.__repo(index)
+                lst_nodes.append({key: value for key, value in dict_repo.items() if key not in self.__repo_details})
+                branch = dict_repo['defaultBranchRef']
+                lst_nodes[-1]['defaultBranchRef'] = {'name': branch['name']} if branch else None
+
+            return json_response({'data': {'organization': {'repositories': {
+                'pageInfo': {'hasNextPage': end < self.__repo_count, 'endCursor': str(end)},
+                'nodes': lst_nodes
+            }}}})
+
+        if 'repository(' in query and 'name' in variables:
+            # The next page of alerts of one repository
+            dict_repo = self.__repo(int(variables['name'].split('-')[1]))
+            alerts = self.__alerts(dict_repo, query, variables['after'])
+            return json_response({'data': {'repository': {'vulnerabilityAlerts': alerts}}})
+
+        if 'repository(' in query:
+            # Details of a batch of repositories, with only the fields asked for
+            dict_data = dict()
+            index = 0
+            while f'name{index}' in variables:
+                dict_repo = self.__repo(int(variables[f'name{index}'].split('-')[1]))
+                fields = query.split(f'repo{index}:')[1].split(f'repo{index + 1}:')[0]
+                dict_data[f'repo{index}'] = {key: dict_repo[key] for key, name in self.__repo_details.items()
+                                             if name in fields}
+                if 'vulnerabilityAlerts' in dict_data[f'repo{index}']:
+                    dict_data[f'repo{index}']['vulnerabilityAlerts'] = self.__alerts(dict_repo, fields, None)
+                index += 1
+
+            return json_response({'data': dict_data})
+
+        if 'contributionsCollection(' in query:
+            dict_data = dict()
+            index = 0
+            while f'login{index}' in variables:
+                dict_data[f'user{index}'] = self.__contributions(variables[f'login{index}'], variables[f'from{index}'])
+                index += 1
+
+            return json_response({'data': dict_data})
+
+        return json_response({'data': None, 'errors': [{'message': 'Query not supported by the synthetic data'}]})
+
+    def respond(self, method, url, data):
+        resource = 'graphql' if urlsplit(url).path == '/graphql' else 'core'
+        with self.__lock:
+            self.__remaining[resource] = max(0, self.__remaining[resource] - 1)
+            remaining = self.__remaining[resource]
+
+        response = self.__respond(method, url, data)
+        if response is None:
+            return None
+
+        status, headers, content = response
+        headers.update({
+            'X-RateLimit-Limit': str(self.__rate_limit),
+            'X-RateLimit-Remaining': str(remaining),
+            'X-RateLimit-Reset': str(self.__reset),
+            'X-RateLimit-Resource': resource
+        })
+        return status, headers, content
+
+    def __respond(self, method, url, data):
+        path = urlsplit(url).path.strip('/').split('/')
+        org_path = ['orgs', self.__org]
+
+        if method == 'POST' and path == ['graphql']:
+            return self.__graphql(data)
+
+        if path == ['rate_limit']:
+            dict_resources = {resource: {
+                'limit': self.__rate_limit,
+                'remaining': remaining,
+                'reset': self.__reset,
+                'used': self.__rate_limit - remaining
+            } for resource, remaining in self.__remaining.items()}
+            return json_response({'resources': dict_resources, 'rate': dict_resources['core']})
+
+        if path == org_path:
+            return json_response({
+                'login': self.__org,
+                'id': 1,
+                'url': f'{self.api}/orgs/{self.__org}',
+                'html_url': f'https://github.com/{self.__org}'
+            })
+
+        if path in [org_path + ['members'], org_path + ['outside_collaborators']]:
+            logins = self.__members() if path[-1] == 'members' else self.__collaborators()
+            if get_query(url).get('filter') == '2fa_disabled':
+                logins = [login for login in logins if self.__no2fa(login)]
+
+            return self.__page(url, [self.__user(login) for login in logins])
+
+        if path == org_path + ['teams']:
+            return self.__page(url, [self.__team(index) for index in range(self.__team_count)])
+
+        if path[:3] == org_path + ['teams'] and len(path) == 5 and path[4] == 'members':
+            index = int(path[3].split('-')[1])
+            rnd = self.__random('team', index)
+            logins = rnd.sample(self.__members(), min(self.__member_count, rnd.randint(1, 20)))
+            return self.__page(url, [self.__user(login) for login in sorted(logins)])
+
+        if path[0] == 'users' and len(path) == 3 and path[2] == 'events':
+            rnd = self.__random('events', path[1])
+            last_active = self.__reference - datetime.timedelta(days=rnd.randint(0, 1000))
+            event = {'id': str(rnd.randint(1, 10 ** 9)), 'type': 'PushEvent', 'created_at': last_active.isoformat()}
+            headers = {'Last-Modified': last_active.strftime('%a, %d %b %Y %H:%M:%S GMT')}
+            return self.__page(url, [event], headers)
+
+        if path[0] == 'repos' and path[3:] == ['stats', 'contributors']:
+            # As Github does, the statistics of some repositories still have to be computed on the first request
+            with self.__lock:
+                computed = path[2] in self.__stats_computed
+                self.__stats_computed.add(path[2])
+
+            if not computed and self.__random('stats', path[2]).random() < 0.3:
+                return json_response({}, status=202)
+
+            rnd = self.__random('contributors', path[2])
+            logins = rnd.sample(self.__members(), min(self.__member_count, rnd.randint(1, 10)))
+            return json_response([{
+                'author': self.__user(login),
+                'total': rnd.randint(1, 1000),
+                'weeks': []
+            } for login in logins])
+
+        return None
+
+
+class SyntheticZoom:
+    # Users, their details and their recordings, month by month
+    def __init__(self, users=500, months=60, seed=1):
+        self.__user_count = users
+        self.__months = months
+        self.__seed = seed
+
+        # Every user was created 'months' months ago, so Zoom scans that many months for each of them
+        today = datetime.date.today()
+        self.__created_at = datetime.datetime(today.year, today.month, 1) - relativedelta(months=months - 1)
+
+    def get_config(self):
+        return {
+            'account_id': 'synthetic',
+            'client_id': 'synthetic',
+            'client_secret': 'synthetic',
+            'recording_warning_size': 10 * 1024 ** 3
+        }
+
+    def __random(self, kind, key):
+        return random.Random(f'{self.__seed}:{kind}:{key}')
+
+    def __user(self, index):
+        rnd = self.__random('user', index)
+        return {
+            'id': f'synthetic{index:05d}',
+            'first_name': f'First{index}',
+            'last_name': f'Last{index}',
+            'display_name': f'First{index} Last{index}',
+            'email': f'user{index}@example.org',
+            'type': rnd.choice([1, 2]),
+            'pmi': 1000000000 + index,
+            'verified': 1,
+            'role_id': '0' if index == 0 else rnd.choice(['1', '2', '2', '2']),
+            'pic_url': f'https://zoom.us/p/synthetic{index:05d}',
+            'last_login_time': '2025-01-01T00:00:00Z',
+            'last_client_version': '6.0.0',
+            'user_created_at': self.__created_at.strftime('%Y-%m-%dT%H:%M:%SZ')
+        }
+
+    def __recordings(self, user_id, month):
+        rnd = self.__random('recordings', f'{user_id}:{month}')
+        return [{
+            'uuid': f'{user_id}-{month}-{number}',
+            'duration': rnd.randint(1, 120),
+            'recording_files': [{'file_size': rnd.randint(10 ** 6, 10 ** 9)} for _ in range(rnd.randint(1, 3))]
+        } for number in range(rnd.choice([0, 0, 1, 2, 3]))]
+
+    def respond(self, method, url, data):
+        parts = urlsplit(url)
+        path = parts.path.strip('/').split('/')
+        query = get_query(url)
+
+        if parts.netloc == 'zoom.us' and path == ['oauth', 'token']:
+            return json_response({'access_token': 'synthetic', 'token_type': 'bearer', 'expires_in': 3600})
+
+        if parts.netloc != 'api.zoom.us' or path[0] != 'v2':
+            return None
+        path = path[1:]
+
+        if path == ['users']:
+            page_size = int(query.get('page_size', 30))
+            start = int(query.get('next_page_token') or 0)
+            end = min(start + page_size, self.__user_count)
+            return json_response({
+                'page_size': page_size,
+                'total_records': self.__user_count,
+                'next_page_token': str(end) if end < self.__user_count else '',
+                'users': [self.__user(index) for index in range(start, end)]
+            })
+
+        if path[0] == 'users' and len(path) == 2:
+            return json_response({'id': path[1], 'personal_meeting_url': f'https://zoom.us/j/{path[1]}'})
+
+        if path[0] == 'users' and path[2:] == ['recordings']:
+            meetings = self.__recordings(path[1], query['from'])
+            return json_response({
+                'from': query['from'],
+                'to': query['to'],
+                'page_size': int(query.get('page_size', 30)),
+                'total_records': len(meetings),
+                'next_page_token': '',
+                'meetings': meetings
+            })
+
+        if path == ['rooms']:
+            return json_response({'rooms': [{'name': f'Room {index}', 'room_id': f'room{index}'}
+                                            for index in range(10)]})
+
+        if path == ['accounts', 'me', 'plans', 'usage']:
+            return json_response({
+                'plan_base': {'hosts': self.__user_count + 50, 'usage': self.__user_count},
+                'plan_recording': {'free_storage': '5 TB', 'free_storage_usage': '1 TB'}
+            })
+
+        return None
+
+
+# Sources per platform, with the size of their data as command line options of the runner
+sources = {
+    'Github': SyntheticGithub,
+    'Zoom': SyntheticZoom
+}
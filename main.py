@@ -1,22 +1,44 @@
 from dotenv import load_dotenv
-from platforms import *
+from platforms import Metrics, Platform, Profiler, Schedule, get_platform, platform_names
+import argparse
 import requests
 import logging
 import traceback
 import datetime
+import threading
+import time
 import psutil
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pp
 
 load_dotenv()
 
 
 class Inventoryst:
-    def __init__(self):
+    def __init__(self, platforms=None, profile=None, profile_memory=False, profile_dir='profiles'):
+        # Loading the configuration validates it, so an invalid configuration fails before any API call
         self.__config = Platform.load_config('general')
         self.__logger = self.init_logger()
+
+        # Only inventorize these platforms, instead of all 'inventories'
+        self.__platforms = platforms
+
+        lst_unknown = [platform for platform in self.__get_inventories() if platform not in platform_names]
+        if lst_unknown:
+            raise ValueError(f"Unknown platform(s): {', '.join(lst_unknown)}")
+
+        # Profiling (see Profiler)
+        if profile is not None and profile not in Profiler.modes:
+            raise ValueError(f"Invalid profiler '{profile}'. Use {' or '.join(Profiler.modes)}.")
+        self.__profile = profile
+        self.__profile_memory = profile_memory
+        self.__profile_dir = profile_dir
         self.__metrics = {'inventoryst': {}}
 
+        # Metrics of the last run of every platform, for the Prometheus textfile
+        self.__last_metrics = dict()
+
     def init_logger(self):
         this_logger = logging.getLogger()
 
@@ -29,7 +51,8 @@ class Inventoryst:
                 c_handler.setLevel(logging.INFO)
                 this_logger.setLevel(logging.INFO)
 
-            log_format = '%(asctime)s  %(levelname)-8s %(message)s'
+            # Platforms run concurrently, so tag every line with the platform (thread) it came from
+            log_format = '%(asctime)s  %(levelname)-8s [%(threadName)s] %(message)s'
             c_format = logging.Formatter(log_format, datefmt='%Y-%m-%d %H:%M:%S')
             c_handler.setFormatter(c_format)
 
@@ -41,52 +64,135 @@ class Inventoryst:
         #ts = datetime.datetime.now()
         self.__metrics['inventoryst'][key] = value
 
-    def inventorize(self):
+    def __write_metrics_textfile(self):
+        # For the textfile collector of the Prometheus node exporter
+        if 'metrics' not in self.__config or 'textfile' not in self.__config['metrics']:
+            return
+
+        textfile = self.__config['metrics']['textfile']
+        with open(textfile + '.tmp', 'w') as f:
+            f.write(Metrics.to_prometheus(self.__last_metrics))
+
+        # The collector must never read half a file
+        os.replace(textfile + '.tmp', textfile)
+
+    def __get_inventories(self):
+        return self.__platforms if self.__platforms else self.__config['inventories']
+
+    def __get_max_workers(self, platform_count):
+        # Profiles are process wide (cProfile, tracemalloc), so platforms are profiled one at a time
+        if self.__profile or self.__profile_memory:
+            return 1
+
+        # Number of platforms we inventorize in parallel. Defaults to 4.
+        max_workers = self.__config['max_workers'] if 'max_workers' in self.__config else 4
+
+        return max(1, min(max_workers, platform_count))
+
+    def __inventorize_platform(self, platform):
+        # Name the worker thread after the platform, so log lines can be told apart
+        threading.current_thread().name = platform
+
+        self.__logger.info(f'Processing {platform}...')
+        duration_date_start = datetime.datetime.now()
+        memory_usage_start = psutil.Process(os.getpid()).memory_info().rss
+
+        dict_result = {
+            'success': 0,
+            'api_calls': 0,
+            'cache_hits': 0,
+            'rate_limit_wait': 0,
+            'pages_changed': 0,
+            'pages_swept': 0,
+            'bytes_written': 0,
+            'syscalls_saved': 0
+        }
+
+        obj_platform = None
+        try:
+            with Profiler(platform, self.__profile, self.__profile_memory, self.__profile_dir):
+                obj_platform = get_platform(platform)()
+                obj_platform.inventorize()
+
+            dict_result['success'] = 1
+
+        except Exception as e:
+            self.__logger.error(f"Processing of {platform} encountered an error")
+            self.__logger.error(e)
+            traceback.print_exc()
+
+        # Also for failed runs: they tell where it went wrong, and how long it took
+        dict_platform_metrics = dict()
+        if obj_platform is not None:
+            dict_result['api_calls'] = obj_platform.get_api_calls()
+            dict_result['cache_hits'] = obj_platform.get_cache_hits()
+            dict_result['rate_limit_wait'] = obj_platform.get_rate_limit_wait()
+            dict_result['pages_changed'] = obj_platform.get_changed_page_count()
+            dict_result['pages_swept'] = obj_platform.get_swept_page_count()
+            dict_result['bytes_written'] = obj_platform.get_bytes_written()
+            dict_result['syscalls_saved'] = obj_platform.get_syscalls_saved()
+            dict_platform_metrics = obj_platform.get_metrics()
+
+        # Time spent
+        duration_date_end = datetime.datetime.now()
+        duration = duration_date_end - duration_date_start
+
+        # Memory usage
+        # Note: RSS is process wide. With platforms running in parallel, this is the growth
+        # of the process while this platform was running.
+        memory_usage_end = psutil.Process(os.getpid()).memory_info().rss
+        memory_usage = memory_usage_end - memory_usage_start
+
+        dict_result['metrics'] = {
+            'success': dict_result['success'],
+            'duration': round(duration.total_seconds(), 3),
+            'memory_usage': memory_usage,
+            'api_calls': dict_result['api_calls'],
+            'cache_hits': dict_result['cache_hits'],
+            'rate_limit_wait': dict_result['rate_limit_wait'],
+            'pages_swept': dict_result['pages_swept'],
+            'bytes_written': dict_result['bytes_written'],
+            'syscalls_saved': dict_result['syscalls_saved'],
+            **dict_platform_metrics
+        }
+
+        return dict_result
+
+    def inventorize(self, lst_inventories_to_fetch=None):
         # Notify that we have started the job
         if 'callback' in self.__config and 'start' in self.__config['callback']:
             requests.get(self.__config['callback']['start'])
 
-        lst_inventories_to_fetch = self.__config['inventories']
+        if lst_inventories_to_fetch is None:
+            lst_inventories_to_fetch = self.__get_inventories()
 
-        # Process all requested platforms
+        # Every run (or cycle, in daemon mode) reports its own metrics
+        self.__metrics = {'inventoryst': {}}
+
+        # Process all requested platforms, in parallel on a bounded pool of workers
+        max_workers = self.__get_max_workers(len(lst_inventories_to_fetch))
+        self.__logger.info(f'Processing {len(lst_inventories_to_fetch)} platforms with {max_workers} workers')
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {platform: executor.submit(self.__inventorize_platform, platform)
+                       for platform in lst_inventories_to_fetch}
+
+        # Collect the results in the order the platforms were requested
         processed_platforms = 0
         page_change_count = 0
         api_calls = dict()
-        for platform in lst_inventories_to_fetch:
-            self.__logger.info(f'Processing {platform}...')
-            duration_date_start = datetime.datetime.now()
-            memory_usage_start = psutil.Process(os.getpid()).memory_info().rss
+        for platform, future in futures.items():
+            dict_result = future.result()
 
-            try:
-                obj_platform = eval(f"{platform}()")
-                obj_platform.inventorize()
+            if dict_result['success'] == 1:
                 processed_platforms += 1
-                api_calls[platform] = obj_platform.get_api_calls()
-                page_change_count += obj_platform.get_changed_page_count()
-
-                success = 1
-
-            except Exception as e:
-                success = 0
+                api_calls[platform] = dict_result['api_calls']
+                page_change_count += dict_result['pages_changed']
 
-                self.__logger.error(f"Processing of {platform} encountered an error")
-                self.__logger.error(e)
-                traceback.print_exc()
+            self.__add_metric(platform, dict_result['metrics'])
 
-            # Time spent
-            duration_date_end = datetime.datetime.now()
-            duration = duration_date_end - duration_date_start
-
-            # Memory usage
-            memory_usage_end = psutil.Process(os.getpid()).memory_info().rss
-            memory_usage = memory_usage_end - memory_usage_start
-
-            p_metrics = {
-                'success': success,
-                'duration': f'{duration.seconds}.{round(duration.microseconds, 2)}',
-                'memory_usage': memory_usage
-            }
-            self.__add_metric(platform, p_metrics)
+        self.__last_metrics.update(self.__metrics['inventoryst'])
+        self.__write_metrics_textfile()
 
         self.__logger.debug(f'Api calls: {str(api_calls)}')
         self.__logger.info(f'Metrics: {str(self.__metrics)}')
@@ -110,5 +216,92 @@ class Inventoryst:
 
                     requests.post(self.__config['callback']['fail'], json=failed_platforms)
 
-obj_inventoryst = Inventoryst()
-obj_inventoryst.inventorize()
+    def __get_schedule(self):
+        schedule_config = self.__config['schedule'] if 'schedule' in self.__config else dict()
+        return Schedule(schedule_config, self.__get_inventories())
+
+    def run_daemon(self):
+        # Runs forever, inventorizing every platform on its own schedule.
+        # The process, and with it imports, configuration, HTTP sessions and caches, stays warm between runs.
+        Platform.keep_warm = True
+
+        schedule = self.__get_schedule()
+
+        # Everything runs right away, after that every platform follows its schedule
+        dict_next_run = {platform: time.time() for platform in self.__get_inventories()}
+
+        while True:
+            now = time.time()
+            lst_due = [platform for platform, next_run in dict_next_run.items() if next_run <= now]
+
+            if lst_due:
+                self.__logger.info(f"Starting cycle for {', '.join(lst_due)}")
+                try:
+                    self.inventorize(lst_due)
+                except Exception as e:
+                    # A failing callback should not take the daemon down
+                    self.__logger.error('Cycle encountered an error')
+                    self.__logger.error(e)
+                    traceback.print_exc()
+
+                for platform in lst_due:
+                    try:
+                        dict_next_run[platform] = schedule.next_run(platform, now)
+                    except ValueError as e:
+                        # A validated schedule always has a next run, but the daemon must never stop on one
+                        self.__logger.error(f"Can not schedule the next run of {platform}: {e}")
+                        dict_next_run[platform] = now + schedule.get_default_interval()
+
+                    next_run = datetime.datetime.fromtimestamp(dict_next_run[platform])
+                    self.__logger.info(f"Next run of {platform} at {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+
+            # Pick up configuration changes between cycles (with config_hot_reload enabled)
+            config = Platform.load_config('general')
+            if config != self.__config:
+                self.__logger.info('Configuration changed. Rescheduling.')
+
+                # Sessions and caches were set up with the old settings
+                if config.get('http') != self.__config.get('http') or config.get('cache') != self.__config.get('cache'):
+                    Platform.release_warm()
+
+                self.__config = config
+                schedule = self.__get_schedule()
+                dict_next_run = {platform: dict_next_run.get(platform, time.time())
+                                 for platform in self.__get_inventories()}
+
+            # Sleep until the next run is due, but check for configuration changes every minute
+            time.sleep(max(1, min(min(dict_next_run.values(), default=now + 60) - time.time(), 60)))
+
+arg_parser = argparse.ArgumentParser(description='Gather information from all kinds of platforms into Markdown files')
+arg_parser.add_argument('--no-cache', action='store_true', help='bypass the HTTP response cache')
+arg_parser.add_argument('--sweep-dry-run', action='store_true',
+                        help='only log the pages that would be archived or deleted')
+arg_parser.add_argument('--daemon', action='store_true',
+                        help='keep running, and inventorize every platform on its own schedule')
+arg_parser.add_argument('--platform', action='append',
+                        help="only inventorize this platform (repeatable), instead of all 'inventories'")
+arg_parser.add_argument('--profile', choices=Profiler.modes, default=os.getenv('INVENTORYST_PROFILE') or None,
+                        help='profile every platform run with cProfile, or with a sampling profiler')
+arg_parser.add_argument('--profile-memory', action='store_true',
+                        default=os.getenv('INVENTORYST_PROFILE_MEMORY', '') in ['1', 'true'],
+                        help='report the memory allocations that grew during every platform run (tracemalloc)')
+arg_parser.add_argument('--profile-dir', default=os.getenv('INVENTORYST_PROFILE_DIR', 'profiles'),
+                        help='directory to write profiles to')
+args = arg_parser.parse_args()
+
+Platform.cache_enabled = not args.no_cache
+Platform.sweep_dry_run = args.sweep_dry_run
+
+# The environment (or .env) can do the same as the command line, e.g. INVENTORYST_PLATFORM=Github,Zoom
+lst_platforms = args.platform
+if not lst_platforms:
+    lst_platforms = [platform for platform in os.getenv('INVENTORYST_PLATFORM', '').split(',') if platform]
+
+obj_inventoryst = Inventoryst(platforms=lst_platforms,
+                              profile=args.profile,
+                              profile_memory=args.profile_memory,
+                              profile_dir=args.profile_dir)
+if args.daemon:
+    obj_inventoryst.run_daemon()
+else:
+    obj_inventoryst.inventorize()
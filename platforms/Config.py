@@ -0,0 +1,313 @@
+import copy
+import datetime
+import logging
+import os
+import threading
+import yaml
+from .Schedule import CronExpression
+
+
+class Config:
+    # The configuration (inventoryst.yaml), parsed once per process and validated before any platform runs.
+    #
+    # With 'config_hot_reload' enabled in the general section, the file is parsed again when its mtime changes.
+    # A changed file that does not validate is rejected, and the last valid configuration stays in use.
+
+    yaml_file = 'inventoryst.yaml'
+
+    __data = None
+    __mtime = None
+    __lock = threading.Lock()
+
+    # Schema per section, as {key: (types, required)}. A dict in place of the types describes a nested section,
+    # and the key '*' applies to every key of a section (e.g. the hosts of MySQL).
+    __numbers = (int, float)
+    __schema = {
+        'general': {
+            'stage': (str, True),
+            'output_directory': ((str, type(None)), True),
+            'inventories': (list, True),
+            'max_workers': (int, False),
+            'callback': ({
+                'start': (str, False),
+                'success': (str, False),
+                'fail': (str, False)
+            }, False),
+            'http': ({
+                'pool_connections': (int, False),
+                'pool_size': (int, False),
+                'keep_alive': (bool, False),
+                'gzip': (bool, False),
+                'max_concurrency_per_host': (int, False),
+                'max_retries': (int, False),
+                'backoff_base': (__numbers, False),
+                'backoff_max': (__numbers, False)
+            }, False),
+            'cache': ({
+                'enabled': (bool, False),
+                'directory': (str, False),
+                'ttl_days': (__numbers, False),
+                'max_size_mb': (__numbers, False)
+            }, False),
+            'state_directory': (str, False),
+            'fsync': (str, False),
+            'sweep': ({
+                'mode': (str, False),
+                'archive_directory': (str, False),
+                'dry_run': (bool, False),
+                'platforms': (list, False)
+            }, False),
+            'config_hot_reload': (bool, False),
+            'metrics': ({
+                'textfile': (str, False)
+            }, False),
+            'schedule': ({
+                'interval': (__numbers, False),
+                'jitter': (__numbers, False),
+                'platforms': ({
+                    '*': ({
+                        'interval': (__numbers, False),
+                        'cron': (str, False),
+                        'jitter': (__numbers, False)
+                    }, False)
+                }, False)
+            }, False)
+        },
+        'cloudflare': {
+            'api_token': (str, True),
+            'account_id': (str, True)
+        },
+        'discourse': {
+            'api_host': (str, True),
+            'api_user': (str, True),
+            'api_key': (str, True),
+            'groups': (list, True)
+        },
+        'dns': {
+            'namecheap': ({
+                'api_key': (str, True),
+                'api_user': (str, True)
+            }, True),
+            'epik': ({
+                'api_key': (str, True)
+            }, True)
+        },
+        'dockerhub': {
+            'org': (str, True),
+            'oat': (str, True),
+            'max_tags': (int, False)
+        },
+        'github': {
+            'orgs': (list, True),
+            'stale_years': (int, True),
+            'graphql_page_size': (int, False),
+            'user_activity_ttl_hours': (__numbers, False),
+            'contributors_deadline': (__numbers, False),
+            'repo_workers': (int, False),
+            'rate_limit_reserve': (int, False),
+            'repo_ttl_hours': ({
+                'commit_count': (__numbers, False),
+                'release_count': (__numbers, False),
+                'dependabot_alerts': (__numbers, False),
+                'contributors': (__numbers, False)
+            }, False)
+        },
+        'grafana': {
+            'host': (str, True),
+            'token': (str, True),
+            'user': ({
+                'inactive_days': (int, True)
+            }, True)
+        },
+        'mysql': {
+            '*': ({
+                'host': (str, True),
+                'user': (str, True),
+                'password': (str, True),
+                'ssl_ca_file': (str, True),
+                'collation': (str, True)
+            }, True)
+        },
+        'netlify': {
+            'api_url': (str, True),
+            'api_key': (str, True),
+            'team': (str, True),
+            'user_inactive_days': (int, True),
+            'last_deploys': (int, True)
+        },
+        'notion': {
+            'integration_secret': (str, True)
+        },
+        'readthedocs': {
+            'api_key': (str, True)
+        },
+        'supabase': {
+            'pat': (str, True)
+        },
+        'zoom': {
+            'account_id': (str, True),
+            'client_id': (str, True),
+            'client_secret': (str, True),
+            'recording_warning_size': (__numbers, True),
+            'recording_reverify_months': (int, False),
+            'recording_workers': (int, False)
+        },
+        'zulip': {
+            'email': (str, True),
+            'api_key': (str, True),
+            'site': (str, True),
+            'user': ({
+                'inactive_days': (int, True)
+            }, True)
+        }
+    }
+
+    # Every platform section can override the rate limits of its hosts: per host, one limit or a list of them
+    # (e.g. per minute and per hour)
+    __rate_limit_schema = {
+        'requests': (__numbers, True),
+        'per': (__numbers, False),
+        'burst': (int, False)
+    }
+
+    @classmethod
+    def get(cls, section):
+        # Returns a copy of the section, so callers can never change the configuration of others.
+        # Raises KeyError for sections that are not configured.
+        with cls.__lock:
+            if cls.__data is None:
+                cls.__load()
+            elif cls.__data['general'].get('config_hot_reload', False):
+                cls.__reload_if_changed()
+
+            return copy.deepcopy(cls.__data[section])
+
+    @classmethod
+    def reload_if_changed(cls):
+        # Returns True when the configuration was reloaded
+        with cls.__lock:
+            if cls.__data is None:
+                cls.__load()
+                return True
+
+            return cls.__reload_if_changed()
+
+    @classmethod
+    def __reload_if_changed(cls):
+        if os.stat(cls.yaml_file).st_mtime_ns == cls.__mtime:
+            return False
+
+        try:
+            cls.__load()
+        except (ValueError, yaml.YAMLError) as e:
+            # Keep running on what we had, and don't retry until the file changes again
+            cls.__mtime = os.stat(cls.yaml_file).st_mtime_ns
+            logging.getLogger().error(f"Changed configuration is invalid, not reloading it. {e}")
+            return False
+
+        logging.getLogger().info(f"Configuration '{cls.yaml_file}' changed. Reloaded it.")
+        return True
+
+    @classmethod
+    def __load(cls):
+        mtime = os.stat(cls.yaml_file).st_mtime_ns
+        with open(cls.yaml_file, 'r') as f:
+            data = yaml.safe_load(f)
+
+        cls.validate(data)
+
+        cls.__data = data
+        cls.__mtime = mtime
+
+    @classmethod
+    def validate(cls, data):
+        # Validates the general section, and the sections of all platforms we are going to inventorize
+        if not isinstance(data, dict) or not isinstance(data.get('general'), dict):
+            raise ValueError(f"Invalid configuration in '{cls.yaml_file}': section 'general' is missing")
+
+        lst_errors = cls.__validate_section('general', data['general'], cls.__schema['general'])
+
+        for platform in data['general'].get('inventories') or list():
+            section = str(platform).lower()
+            if section not in data:
+                lst_errors.append(f"section '{section}' for platform '{platform}' is missing")
+            elif section in cls.__schema:
+                lst_errors += cls.__validate_section(section, data[section], cls.__schema[section])
+
+        # Cron expressions are parsed here already, and must match at least once (e.g. not on February 31st),
+        # so a daemon never picks up a schedule it can't follow
+        schedule_config = data['general'].get('schedule')
+        if isinstance(schedule_config, dict) and isinstance(schedule_config.get('platforms'), dict):
+            for platform, entry in schedule_config['platforms'].items():
+                if isinstance(entry, dict) and isinstance(entry.get('cron'), str):
+                    try:
+                        CronExpression(entry['cron']).next(datetime.datetime.now())
+                    except ValueError as e:
+                        lst_errors.append(f"'general.schedule.platforms.{platform}.cron': {e}")
+
+        if lst_errors:
+            raise ValueError(f"Invalid configuration in '{cls.yaml_file}': " + '; '.join(lst_errors))
+
+    @classmethod
+    def __validate_section(cls, path, section, schema):
+        lst_errors = list()
+
+        if not isinstance(section, dict):
+            return [f"'{path}' must be a mapping"]
+
+        for key, value in section.items():
+            if key == 'rate_limits' and path in cls.__schema and path != 'general':
+                lst_errors += cls.__validate_rate_limits(f'{path}.{key}', value)
+                continue
+
+            if key in schema:
+                types, required = schema[key]
+            elif '*' in schema:
+                types, required = schema['*']
+            else:
+                # Unknown keys are allowed, so older configurations keep working
+                continue
+
+            lst_errors += cls.__validate_value(f'{path}.{key}', value, types)
+
+        for key, (types, required) in schema.items():
+            if required and key != '*' and key not in section:
+                lst_errors.append(f"'{path}.{key}' is required")
+
+        return lst_errors
+
+    @classmethod
+    def __validate_rate_limits(cls, path, rate_limits):
+        if not isinstance(rate_limits, dict):
+            return [f"'{path}' must be a mapping"]
+
+        lst_errors = list()
+        for host, limits in rate_limits.items():
+            if isinstance(limits, list):
+                for index, limit in enumerate(limits):
+                    lst_errors += cls.__validate_section(f'{path}.{host}[{index}]', limit, cls.__rate_limit_schema)
+            else:
+                lst_errors += cls.__validate_section(f'{path}.{host}', limits, cls.__rate_limit_schema)
+
+        return lst_errors
+
+    @classmethod
+    def __validate_value(cls, path, value, types):
+        if isinstance(types, dict):
+            return cls.__validate_section(path, value, types)
+
+        # bool is an int in Python, but a 'true' where a number is expected is a mistake
+        if isinstance(value, bool) and bool not in (types if isinstance(types, tuple) else (types,)):
+            return [f"'{path}' must be of type {cls.__type_names(types)}"]
+
+        if not isinstance(value, types):
+            return [f"'{path}' must be of type {cls.__type_names(types)}"]
+
+        return list()
+
+    @staticmethod
+    def __type_names(types):
+        if isinstance(types, tuple):
+            return ' or '.join([t.__name__ for t in types])
+
+        return types.__name__
@@ -1,12 +1,25 @@
 from .Platform import Platform
-import requests
 import xmltodict
+from itertools import islice
 from pprint import pp
 import datetime
-import time
 
 
 class DNS(Platform):
+    # Namecheap allows 50 calls per minute, 700 per hour and 8000 per day across the whole key
+    # https://www.namecheap.com/support/knowledgebase/article.aspx/9739/63/api-faq/#z
+    # The hourly and daily budgets can be used in bursts, at the pace of the per minute limit.
+    _rate_limits = {
+        'api.namecheap.com': [
+            {'requests': 50, 'per': 60},
+            {'requests': 700, 'per': 3600, 'burst': 700},
+            {'requests': 8000, 'per': 86400, 'burst': 8000}
+        ]
+    }
+
+    # Once over the limit, there is no point in retrying within the same one minute window
+    __namecheap_retry_delay = 60
+
     def __init__(self):
         super().__init__()
 
@@ -25,26 +38,25 @@ class DNS(Platform):
         self.epik_api_key = self.__config['epik']['api_key']
 
     def __get_json_from_xml(self, url):
-        raw = requests.get(url)
+        raw = self._get_json_from_url(url, raw=True)
         results = xmltodict.parse(raw.content)
 
         self._logger.debug(results)
-        self._inc_api_call()
 
         return results
 
-    def __get_epik_data(self, command):
+    def __get_epik_url(self, command):
         # https://docs.userapi.epik.com/v2/
+        return f"https://usersapiv2.epik.com/v2/{command}?SIGNATURE={self.epik_api_key}&per_page=100"
 
-        epik_api_url = f"https://usersapiv2.epik.com/v2/{command}?SIGNATURE={self.epik_api_key}&per_page=100"
-
-        dict_results = self._get_json_from_url(epik_api_url)
+    def __get_epik_data(self, command):
+        dict_results = self._get_json_from_url(self.__get_epik_url(command))
 
         self._logger.debug(dict_results)
 
         return dict_results
 
-    def __get_namecheap_data(self, command, query_params=None):
+    def __get_namecheap_url(self, command, query_params=None):
         query_params = f"&{query_params}" if query_params else ""
 
         namecheap_api_url = (f"https://api.namecheap.com/xml.response?ApiUser=dsmedia&"
@@ -52,20 +64,40 @@ class DNS(Platform):
                              f"Command=namecheap.{command}&ClientIp=77.160.30.156&PageSize=100&"
                              f"SortBy=NAME{query_params}")
 
+        return namecheap_api_url
+
+    def __get_namecheap_data(self, command, query_params=None):
+        return self.__get_namecheap_data_from_url(self.__get_namecheap_url(command, query_params))
+
+    def __get_namecheap_data_from_url(self, namecheap_api_url):
         self._logger.debug(namecheap_api_url)
 
         dict_results = self.__get_json_from_xml(namecheap_api_url)
 
         # self._logger.debug(dict_results)
 
-        # If we hit the API rate limit (50/min, 700/hour, and 8000/day across the whole key), wait 1 minute, then retry
-        # https://www.namecheap.com/support/knowledgebase/article.aspx/9739/63/api-faq/#z
+        # If we still hit the API rate limit (e.g. the hourly one), back off and retry.
+        # Namecheap reports this in the payload, not with a status code.
+        attempt = 0
+        waited_for_hour = False
         while (dict_results["ApiResponse"]["@Status"] == "ERROR" and
                dict_results["ApiResponse"]["Errors"]["Error"]["#text"] == 'Too many requests'):
             self._logger.debug(f"Namecheap API rate limit hit ({self.__namecheap_api_counter} calls). "
-                              f"Waiting (1m) and retrying...")
+                              f"Backing off and retrying...")
+
+            if self._wait_before_retry(attempt, min_delay=self.__namecheap_retry_delay):
+                attempt += 1
+            elif not waited_for_hour:
+                # Still over the limit after several minutes, so it is the hourly one (e.g. the key is used
+                # elsewhere as well): wait for the next hour
+                now = datetime.datetime.now()
+                next_hour = now.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+                self._logger.warning(f"Namecheap API rate limit still exceeded, waiting until {next_hour:%H:%M}")
+                self._wait_for_rate_limit((next_hour - now).total_seconds())
+                waited_for_hour = True
+            else:
+                raise RuntimeError(f"Namecheap API rate limit still exceeded after {attempt} retries and an hour")
 
-            time.sleep(60)
             dict_results = self.__get_json_from_xml(namecheap_api_url)
 
         # indicates successful call
@@ -73,18 +105,27 @@ class DNS(Platform):
 
         return dict_results
 
+    @staticmethod
+    def __get_namecheap_domains_from_page(dict_domains):
+        result = dict_domains["ApiResponse"]["CommandResponse"]["DomainGetListResult"]
+        if not result or 'Domain' not in result:
+            return list()
+
+        # xmltodict returns a dict when a page holds only one domain
+        domains = result["Domain"]
+        return [domains] if isinstance(domains, dict) else domains
+
     def __enumerate_namecheap_domains(self):
         lst_domains = list()
 
-        # NameCheap
-        dict_domains = self.__get_namecheap_data("domains.getlist")
-
-        domains = dict_domains["ApiResponse"]["CommandResponse"]["DomainGetListResult"]["Domain"]
-        self._logger.info(f"Number of domains: {len(domains)}")
+        # NameCheap, streamed page by page
+        domains = self._paginate(self.__get_namecheap_url("domains.getlist"),
+                                 items=self.__get_namecheap_domains_from_page, scheme='page', page_param='Page',
+                                 page_size=100, fetch=self.__get_namecheap_data_from_url)
 
         # Just 5 domains is enough for local debugging
         if self._stage == 'dev':
-            domains = domains[0:5]
+            domains = islice(domains, 5)
 
         for item in domains:
             self._logger.debug(f"Collecting info for '{item['@Name']}'")
@@ -160,17 +201,18 @@ class DNS(Platform):
             # Finally, add to lst_domains
             lst_domains.append(domain)
 
+        self._logger.info(f"Number of domains: {len(lst_domains)}")
         return lst_domains
 
     def __enumerate_epik_domains(self):
         lst_domains = list()
 
-        domains = self.__get_epik_data('domains')['data']
-        self._logger.info(f"Number of domains: {len(domains)}")
+        # Epik, streamed page by page
+        domains = self._paginate(self.__get_epik_url('domains'), items='data', scheme='page', page_size=100)
 
         # Just 5 domains is enough for local debugging
         if self._stage == 'dev':
-            domains = domains[0:5]
+            domains = islice(domains, 5)
 
         for item in domains:
             self._logger.debug(f"Collecting info for '{item['domain'].lower()}'")
@@ -223,6 +265,7 @@ class DNS(Platform):
             # Finally, add to lst_domains
             lst_domains.append(domain)
 
+        self._logger.info(f"Number of domains: {len(lst_domains)}")
         return lst_domains
 
     def __enumerate_domains(self):
@@ -1,4 +1,5 @@
 from .Platform import Platform
+from itertools import islice
 
 class DockerHub(Platform):
 
@@ -10,6 +11,12 @@ class DockerHub(Platform):
 
     self.__api_url = 'https://hub.docker.com/v2'
     self.__org_name = self.__config['org']
+
+    # Number of (latest) tags to list per repository. DockerHub pages hold up to 100 items.
+    self.__max_tags = self.__config['max_tags'] if 'max_tags' in self.__config else 10
+
+    # The access token is new every run; cached responses belong to the organization access token
+    self._set_credential_identity(self.__org_name, self.__config['oat'])
     api_access_token = self.__request_access_token()
     self.__headers = [
       ['Authorization', 'Bearer ' + api_access_token],
@@ -37,40 +44,52 @@ class DockerHub(Platform):
     dict_repos["content"] = list()
 
     url = f"{self.__api_url}/namespaces/{self.__org_name}/repositories?page_size=100&ordering=last_updated"
-    repo_data = self._get_json_from_url(url)
+    pages = self._paginate_pages(url, items='results', scheme='next')
 
-    if 'results' in repo_data:
+    repo_count = 0
+    lst_repo_field_filter = ['name', 'status_description', 'description', 'is_private', 'pull_count',
+                             'last_updated', 'date_registered', 'categories', 'storage_size']
+    for lst_repositories in pages:
+      repo_count += len(lst_repositories)
 
-      dict_repos['meta']['repo_count'] = repo_data['count']
+      # Get the tags of all repositories on this page concurrently
+      urls_tags = [self.__get_repository_tags_url(repository['name']) for repository in lst_repositories]
+      lst_tag_data = self._get_json_from_urls(urls_tags)
 
-      lst_repo_field_filter = ['name', 'status_description', 'description', 'is_private', 'pull_count',
-                               'last_updated', 'date_registered', 'categories', 'storage_size']
-      for repository in repo_data['results']:
+      for repository, raw_tag_data in zip(lst_repositories, lst_tag_data):
         dict_repo = self._filter_fields(repository, lst_repo_field_filter)
 
         # Supplement with tag data
-        tag_data = self.__enumerate_repository_tags(repository['name'])
+        tag_data = self.__enumerate_repository_tags(raw_tag_data)
         if len(tag_data['content']):
           dict_repo['tags'] = tag_data
 
         dict_repos['content'].append(dict_repo)
 
+    dict_repos['meta']['repo_count'] = repo_count
+
     return dict_repos
 
-  def __enumerate_repository_tags(self, repository):
+  def __get_repository_tags_url(self, repository):
+    page_size = min(self.__max_tags, 100)
+    return f"{self.__api_url}/namespaces/{self.__org_name}/repositories/{repository}/tags?page_size={page_size}"
+
+  def __enumerate_repository_tags(self, tag_data):
     dict_tags = dict()
     dict_tags['meta'] = dict()
     dict_tags['content'] = list()
 
-    url = f"{self.__api_url}/namespaces/{self.__org_name}/repositories/{repository}/tags"
-
-    tag_data = self._get_json_from_url(url)
-
-    if 'results' in tag_data:
+    if tag_data and 'results' in tag_data:
       dict_tags['meta']['tag_count'] = tag_data['count']
 
+      # The first page came in already. Only follow 'next' when we want to list more tags than fit on one page.
+      tags = tag_data['results']
+      if len(tags) < self.__max_tags and tag_data['next']:
+        more_tags = self._paginate(tag_data['next'], items='results', scheme='next')
+        tags = tags + list(islice(more_tags, self.__max_tags - len(tags)))
+
       lst_tag_field_filter = ['name', 'last_updated', 'full_size', 'tag_last_pushed', 'digest']
-      for tag in tag_data['results']:
+      for tag in tags:
         dict_tag = self._filter_fields(tag, lst_tag_field_filter)
         dict_tags['content'].append(dict_tag)
 
@@ -88,11 +107,12 @@ class DockerHub(Platform):
     group_data = self._get_json_from_url(url, headers=self.__headers)
     return group_data
 
-  def __enumerate_group_members(self, group_name):
-    url = f"{self.__api_url}/orgs/{self.__org_name}/groups/{group_name}/members"
+  def __enumerate_group_members(self, group_names):
+    # Get the members of all groups concurrently
+    urls = [f"{self.__api_url}/orgs/{self.__org_name}/groups/{group_name}/members" for group_name in group_names]
 
-    member_data = self._get_json_from_url(url, headers=self.__headers)
-    return member_data
+    lst_member_data = self._get_json_from_urls(urls, headers=self.__headers)
+    return lst_member_data
 
   def __enumerate_teams_users(self):
     dict_users = dict()
@@ -117,11 +137,11 @@ class DockerHub(Platform):
 
     if 'results' in teams:
       dict_users['meta']['team_count'] = teams['count']
-      for team in teams['results']:
+      lst_members = self.__enumerate_group_members([team['name'] for team in teams['results']])
+      for team, members in zip(teams['results'], lst_members):
         dict_team = self._filter_fields(team, list_team_field_filter)
 
-        members = self.__enumerate_group_members(dict_team['name'])
-        if 'results' in members:
+        if members and 'results' in members:
           dict_team['members'] = [user['username'] for user in members['results']]
           dict_users['content']['teams'].append(dict_team)
 
@@ -149,9 +169,9 @@ class DockerHub(Platform):
       lst_content.append(self._item('Updated', self._format_date(repo['date_registered'])))
       lst_content.append(self._item('Categories', ', '.join([v['name'] for v in repo['categories']])))
       lst_content.append(self._item('Size', self._format_bytes(repo['storage_size'])))
-      if len(repo['tags']['content']):
+      if 'tags' in repo:
         tag_count = repo['tags']['meta']['tag_count']
-        message = self._note('(only showing the latest 10 tags)') if tag_count > 10 else ''
+        message = self._note(f'(only showing the latest {self.__max_tags} tags)') if tag_count > self.__max_tags else ''
         lst_content.append(self._item('Tags', f'{tag_count} {message}'))
         for tag in repo['tags']['content']:
           lst_content.append(self._item('Tag', tag['name'], prefix='- '))
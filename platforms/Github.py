@@ -1,95 +1,353 @@
 from .Platform import Platform
-from github import Consts, Github as Gh
+from .RateGovernor import RateBudget
+from concurrent.futures import ThreadPoolExecutor
+from github import Github as Gh
 from pprint import pp
-import re
+from dateutil import parser
 from dateutil.relativedelta import relativedelta
 from datetime import datetime, timezone
+import time
+import zlib
 
 class Github(Platform):
+  # Repository fields fetched in bulk through GraphQL, for a page of repos at a time.
+  # These are cheap, counts included: GraphQL hands out totals without listing what is counted.
+  # The details of a repository (below) are only fetched when they may have changed.
+  __repos_query = """
+    query($org: String!, $first: Int!, $after: String) {
+      organization(login: $org) {
+        repositories(first: $first, after: $after, orderBy: {field: PUSHED_AT, direction: DESC}) {
+          pageInfo { hasNextPage endCursor }
+          nodes {
+            name
+            nameWithOwner
+            url
+            description
+            isArchived
+            visibility
+            createdAt
+            pushedAt
+            diskUsage
+            defaultBranchRef { name }
+            hasVulnerabilityAlertsEnabled
+            tags: refs(refPrefix: "refs/tags/", first: 0) { totalCount }
+            branches: refs(refPrefix: "refs/heads/", first: 0) { totalCount }
+            pullRequests(states: OPEN) { totalCount }
+          }
+        }
+      }
+    }
+  """
+
+  # Details of a repository, with how long (in hours) they are kept before being fetched again.
+  # All of them are fetched again as soon as the repository has been pushed to.
+  __repo_ttl_hours = {
+    'commit_count': 168,
+    'release_count': 24,
+    'dependabot_alerts': 24,
+    'contributors': 168
+  }
+
+  # GraphQL fields per detail, fetched for a batch of repositories at a time. Contributors come from the REST API.
+  __repo_detail_fields = {
+    'commit_count': 'defaultBranchRef { target { ... on Commit { history { totalCount } } } }',
+    'release_count': 'releases { totalCount }',
+    'dependabot_alerts': 'vulnerabilityAlerts(states: OPEN, first: 100) { pageInfo { hasNextPage endCursor } '
+                         'nodes { number securityVulnerability { severity package { name } } } }'
+  }
+  __repo_batch_size = 50
+
+  # Open Dependabot alerts of a repository beyond the first page, which comes with the details above
+  __alerts_query = """
+    query($owner: String!, $name: String!, $after: String) {
+      repository(owner: $owner, name: $name) {
+        vulnerabilityAlerts(states: OPEN, first: 100, after: $after) {
+          pageInfo { hasNextPage endCursor }
+          nodes { number securityVulnerability { severity package { name } } }
+        }
+      }
+    }
+  """
+
+  # Seconds between requests for contributor statistics that Github is still computing; doubled after every round,
+  # up to the maximum
+  __stats_poll_interval = 5
+  __stats_poll_max_interval = 40
+
+  # Contributor statistics are asked for this many repositories at a time, so the responses for a large organization
+  # are never all held at once
+  __stats_chunk_size = 200
+
+  # Contributions of one user (in a batch of users) since a given date, per day
+  __activity_query = """
+    userINDEX: user(login: $loginINDEX) {
+      contributionsCollection(from: $fromINDEX) {
+        contributionCalendar { weeks { contributionDays { date contributionCount } } }
+      }
+    }
+  """
+  __activity_batch_size = 50
+
   def __init__(self):
     super().__init__()
 
     # Load config
     self.__config = self.load_config('github')
 
-    # Determine organization to inventorize for today
-    dict_org = self.__determine_org(self.__config)
-    self.__org, gh_token = list(dict_org.items())[0]
+    # All configured organizations are inventorized, each with its own token
+    self.__orgs = self.__get_orgs(self.__config)
 
+    # Need manual API connections for specific purposes
+    self.__github_api_url = 'https://api.github.com/'
+
+    self.__github_api = None
+
+  def __get_orgs(self, gh_config):
+    # 'orgs' is a list of {org: token} items
+    lst_orgs = list()
+    for dict_org in gh_config['orgs']:
+      lst_orgs += list(dict_org.items())
+
+    return lst_orgs
+
+  def __set_org(self, org, gh_token):
     # Github module
-    self.__github_api = Gh(gh_token)
+    self.__github_api = Gh(gh_token, base_url=self._rewrite_url('https://api.github.com'))
     self.__github_api.per_page = 100
 
     # Set org
-    self.__obj_org = self.__github_api.get_organization(self.__org)
-
-    # Set Waiting time to 5 (from default 2)
-    Consts.PROCESSING_202_WAIT_TIME = 5
+    self.__org = org
+    self.__obj_org = self.__github_api.get_organization(org)
 
-    # Need manual API connections for specific purposes
-    self.__github_api_url = 'https://api.github.com/'
     self.__headers = [
       ['Authorization', 'Bearer ' + gh_token],
       [ 'X-GitHub-Api-Version', '2022-11-28']
     ]
 
-  def __determine_org(self, gh_config):
-    orgs = gh_config['orgs']
+    # Every token has a rate limit budget of its own, shared by all requests for the organization
+    reserve = self.__config['rate_limit_reserve'] if 'rate_limit_reserve' in self.__config else 200
+    self.__budget = RateBudget(reserve)
 
-    # We only inventorize one organization per day because of the amount of requests.
-    # Monday is 0 and Sunday is 6.
-    weekday = datetime.weekday(datetime.now())
-    if weekday == 6:
-      # On Sundays, we rest, as suggested by my daughter :)
-      return None
-    elif weekday < 3:
-      org = orgs[weekday]
-    else:
-      org = orgs[weekday % len(orgs)]
+  def __update_budget(self, rate_limit):
+    # Starting point of the budget, from get_rate_limit(). Responses keep it up to date from there.
+    for resource in ['core', 'graphql']:
+      rate = getattr(rate_limit.resources, resource)
+      self.__budget.update(resource, rate.remaining, rate.reset.timestamp())
 
-    return org
+  def __graphql(self, query, variables):
+    url = f'{self.__github_api_url}graphql'
 
-  def __get_commit_count(self, repo: str):
-    url = f'{self.__github_api_url}/repos/{repo}/commits?per_page=1&page=1'
-    results = self._get_json_from_url(url, headers=self.__headers, raw=True)
+    self._wait_for_rate_limit(self.__budget.reserve('graphql'))
+    response = self._get_json_from_url(url, headers=self.__headers, data={'query': query, 'variables': variables}, raw=True)
+    self.__budget.update_from_headers(response.headers, 'graphql')
 
-    links = results.headers['Link'].split(',')
-    commits = re.findall(r'&page=(\d+)', links[-1])
+    result = response.json() if response else None
 
-    return commits[0]
+    if not result or 'data' not in result or result['data'] is None:
+      raise RuntimeError(f'GraphQL query failed: {result}')
 
-  def __enumerate_dependabot_alerts(self, obj_repo):
-    # First check if this repo has dependabot alerts enabled
-    repo_name = obj_repo.full_name
-    check_url = f"{self.__github_api_url}/repos/{repo_name}/vulnerability-alerts"
-    result = self._get_json_from_url(check_url, self.__headers, raw=True)
+    if 'errors' in result:
+      self._logger.warning(f"GraphQL query returned errors: {result['errors']}")
 
-    # If Vulnerability alerts are NOT enabled, a 404 is returned.
-    if result.status_code == 404:
-      return None
+    return result['data']
 
-    lst_alerts = list()
+  def __graphql_repos(self, org: str):
+    # Yields all repositories of the organization, most recently pushed first
+    page_size = self.__config['graphql_page_size'] if 'graphql_page_size' in self.__config else 50
+    variables = {'org': org, 'first': page_size, 'after': None}
 
-    dependabot_alerts = obj_repo.get_dependabot_alerts(state='open')
-    self._inc_api_call()
+    while True:
+      repositories = self.__graphql(self.__repos_query, variables)['organization']['repositories']
+
+      yield from repositories['nodes']
+
+      if not repositories['pageInfo']['hasNextPage']:
+        break
+
+      variables['after'] = repositories['pageInfo']['endCursor']
+
+  def __get_alert_nodes(self, org: str, name: str, alerts):
+    # All open alerts of a repository, starting from the first page
+    lst_nodes = list(alerts['nodes'])
+
+    page_info = alerts['pageInfo']
+    while page_info['hasNextPage']:
+      variables = {'owner': org, 'name': name, 'after': page_info['endCursor']}
+      alerts = self.__graphql(self.__alerts_query, variables)['repository']['vulnerabilityAlerts']
+
+      lst_nodes += alerts['nodes']
+      page_info = alerts['pageInfo']
 
-    field_filter = ['security_vulnerability', 'html_url', 'updated_at']
-    for alerts in dependabot_alerts:
-      dict_alert = self._filter_fields(alerts, field_filter)
-      lst_alerts.append(dict_alert)
+    return lst_nodes
+
+  def __get_dependabot_alerts(self, repo_url, lst_nodes):
+    # GraphQL names severities slightly different than the REST API
+    severities = {'LOW': 'low', 'MODERATE': 'medium', 'HIGH': 'high', 'CRITICAL': 'critical'}
+
+    lst_alerts = list()
+    for alert in lst_nodes:
+      lst_alerts.append({
+        'severity': severities[alert['securityVulnerability']['severity']],
+        'package': alert['securityVulnerability']['package']['name'],
+        'html_url': f"{repo_url}/security/dependabot/{alert['number']}"
+      })
 
     return lst_alerts
 
+  def __get_repo_state(self, dict_org_state, full_name, pushed_at):
+    # The details of a repository as fetched before. When it has been pushed to since, they are all marked stale:
+    # they are fetched again, but shown until that succeeds.
+    if full_name not in dict_org_state:
+      return {'pushed_at': pushed_at, 'fields': dict()}
+
+    repo_state = dict_org_state[full_name]
+    if repo_state['pushed_at'] == pushed_at:
+      return repo_state
+
+    dict_fields = {field: dict(dict_field, stale=True) for field, dict_field in repo_state['fields'].items()}
+    return {'pushed_at': pushed_at, 'fields': dict_fields}
+
+  def __is_expired(self, full_name, repo_state, field):
+    if field not in repo_state['fields'] or repo_state['fields'][field].get('stale'):
+      return True
+
+    ttl_hours = self.__repo_ttl_hours[field]
+    if 'repo_ttl_hours' in self.__config and field in self.__config['repo_ttl_hours']:
+      ttl_hours = self.__config['repo_ttl_hours'][field]
+
+    # Details fetched in the same run would all expire in the same run as well. Spread them out, per repository,
+    # over an extra quarter of the TTL.
+    ttl_hours *= 1 + (zlib.crc32(f'{full_name}/{field}'.encode()) % 1000) / 4000
+
+    fetched_at = parser.parse(repo_state['fields'][field]['fetched_at'])
+    return fetched_at + relativedelta(hours=ttl_hours) < self._now
+
+  def __set_repo_field(self, repo_state, field, value):
+    repo_state['fields'][field] = {'value': value, 'fetched_at': self._now.isoformat()}
+
+  def __fetch_repo_details(self, org: str, lst_jobs):
+    # Fetches the expired GraphQL details of repositories, a batch of repositories per query.
+    # lst_jobs: [(dict_repo, repo_state, [field, ...])]
+    lst_jobs = [job for job in lst_jobs if any(field in self.__repo_detail_fields for field in job[2])]
+
+    lst_batches = [lst_jobs[start:start + self.__repo_batch_size] for start in range(0, len(lst_jobs), self.__repo_batch_size)]
+
+    # Batches are fetched by a pool of workers, drawing from the same rate limit budget.
+    # Results are handled in the order of the batches, on this thread.
+    workers = self.__config['repo_workers'] if 'repo_workers' in self.__config else 4
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+      results = executor.map(lambda batch: self.__graphql_repo_details(org, batch), lst_batches)
+
+      for batch, data in zip(lst_batches, self.__in_fetch_phase(results)):
+        for index, (dict_repo, repo_state, lst_expired) in enumerate(batch):
+          node = data[f'repo{index}'] if f'repo{index}' in data else None
+          if node is None:
+            # Gone (or renamed) in the meantime; try again on the next run
+            continue
+
+          if 'commit_count' in lst_expired:
+            branch = node['defaultBranchRef']
+            self.__set_repo_field(repo_state, 'commit_count', branch['target']['history']['totalCount'] if branch else 0)
+
+          if 'release_count' in lst_expired:
+            self.__set_repo_field(repo_state, 'release_count', node['releases']['totalCount'])
+
+          if 'dependabot_alerts' in lst_expired:
+            lst_nodes = self.__get_alert_nodes(org, dict_repo['name'], node['vulnerabilityAlerts'])
+            self.__set_repo_field(repo_state, 'dependabot_alerts',
+                                  self.__get_dependabot_alerts(dict_repo['html_url'], lst_nodes))
+
+  def __in_fetch_phase(self, results):
+    # Waiting on the workers is fetching as well
+    while True:
+      with self._phase('fetch'):
+        result = next(results, None)
+      if result is None:
+        break
+      yield result
+
+  def __graphql_repo_details(self, org: str, batch):
+    # The expired details of a batch of repositories, in one query
+    lst_params = ['$owner: String!']
+    lst_fields = list()
+    variables = {'owner': org}
+    for index, (dict_repo, repo_state, lst_expired) in enumerate(batch):
+      fields = ' '.join([self.__repo_detail_fields[field] for field in lst_expired if field in self.__repo_detail_fields])
+
+      lst_params.append(f'$name{index}: String!')
+      lst_fields.append(f'repo{index}: repository(owner: $owner, name: $name{index}) {{ {fields} }}')
+      variables[f'name{index}'] = dict_repo['name']
+
+    query = f"query({', '.join(lst_params)}) {{ {' '.join(lst_fields)} }}"
+    return self.__graphql(query, variables)
+
+  def __fetch_repo_contributors(self, lst_jobs):
+    # Github computes contributor statistics on request, and answers 202 until they are ready. So the statistics
+    # of all repositories are asked for in one round, and those that are not ready yet are asked for again, with a
+    # growing interval, until 'contributors_deadline' (seconds) has passed. That way, the waits overlap instead of
+    # adding up. Repositories still pending after the deadline keep the contributors of the previous run.
+    deadline = time.monotonic() + (self.__config['contributors_deadline'] if 'contributors_deadline' in self.__config else 120)
+    poll_interval = self.__stats_poll_interval
+
+    dict_pending = {f"{self.__github_api_url}repos/{dict_repo['full_name']}/stats/contributors": repo_state
+                    for dict_repo, repo_state, lst_expired in lst_jobs if 'contributors' in lst_expired}
+
+    while dict_pending:
+      lst_urls = list(dict_pending)
+
+      for start in range(0, len(lst_urls), self.__stats_chunk_size):
+        urls = lst_urls[start:start + self.__stats_chunk_size]
+
+        # The rate limit doesn't get to stretch the deadline either. Requests that won't be sent aren't taken from
+        # the budget.
+        if time.monotonic() + self.__budget.wait_for('core', len(urls)) > deadline:
+          self._logger.warning(f'Contributor statistics of {len(lst_urls) - start} repositories can not be asked for '
+                               f'before the deadline, using those of the previous run')
+          dict_pending.clear()
+          break
+
+        self._wait_for_rate_limit(self.__budget.reserve('core', len(urls)))
+        results = self._get_json_from_urls(urls, headers=self.__headers, raw=True)
+
+        for url, result in zip(urls, results):
+          self.__budget.update_from_headers(result.headers, 'core')
+          if result.status_code == 202:
+            continue
+
+          repo_state = dict_pending.pop(url)
+          if result.status_code == 200:
+            self.__set_repo_field(repo_state, 'contributors',
+                                  [c['author']['login'] if c['author'] else "Unknown" for c in result.json()])
+          elif result.status_code == 204:
+            # No commits (yet)
+            self.__set_repo_field(repo_state, 'contributors', [])
+          else:
+            self._logger.warning(f"Contributor statistics for '{url}' returned {result.status_code}")
+
+        del results
+
+      if dict_pending and time.monotonic() + poll_interval > deadline:
+        self._logger.warning(f'Contributor statistics of {len(dict_pending)} repositories were not ready in time, '
+                             f'using those of the previous run')
+        break
+
+      if dict_pending:
+        self._logger.info(f'Waiting {poll_interval}s for contributor statistics of {len(dict_pending)} repositories')
+        with self._phase('fetch'):
+          time.sleep(poll_interval)
+        poll_interval = min(poll_interval * 2, self.__stats_poll_max_interval)
+
   def __enumerate_repos(self, org: str):
     dict_repos = dict()
     dict_repos["meta"] = dict()
     dict_repos["content"] = list()
 
-    repos = self.__github_api.get_organization(org).get_repos(sort='pushed', direction='desc')
-    self._inc_api_call(2)
+    repos = self.__graphql_repos(org)
 
-    field_filter = ['name', 'full_name', 'html_url', 'archived', 'visibility', 'pushed_at', 'description',
-                    'size', 'default_branch']
+    # Details of repositories from the previous runs, with the pushed_at they were fetched at
+    dict_state = self._load_state('github_repos')
+    dict_org_state = dict_state[org] if org in dict_state else dict()
+    dict_new_state = dict()
 
     repo_count = 0
     repo_archived_count = 0
@@ -97,12 +355,26 @@ class Github(Platform):
     repo_private_count = 0
     repo_total_size = 0
     repo_with_sec_alert_counts = 0
-    for obj_repo in repos:
+    lst_jobs = list()
+    for repo in repos:
 
       repo_count += 1
 
       # Standard fields
-      dict_repo = self._filter_fields(obj_repo, field_filter)
+      dict_repo = {
+        'name': repo['name'],
+        'full_name': repo['nameWithOwner'],
+        'html_url': repo['url'],
+        'archived': repo['isArchived'],
+        'visibility': repo['visibility'].lower(),
+        'pushed_at': parser.parse(repo['pushedAt'] if repo['pushedAt'] else repo['createdAt']),
+        'description': repo['description'],
+        'size': repo['diskUsage'] if repo['diskUsage'] else 0,
+        'default_branch': repo['defaultBranchRef']['name'] if repo['defaultBranchRef'] else None,
+        'tag_count': repo['tags']['totalCount'],
+        'branch_count': repo['branches']['totalCount'],
+        'open_pr_count': repo['pullRequests']['totalCount']
+      }
 
       # Getting totals for several metrics
       repo_total_size += dict_repo['size']
@@ -122,28 +394,21 @@ class Github(Platform):
 
       # Check if repo is empty (size = 0)
       # Additional information is not available or relevant for an empty (uninitialized) repo
-      if dict_repo['size'] > 0:
-
-        # Number of commits
-        dict_repo['commit_count'] = self.__get_commit_count(dict_repo['full_name'])
-
-        # Contributors
-        contributors = obj_repo.get_stats_contributors()
-        self._inc_api_call()
-        dict_repo['contributors'] = [c.author.login if c.author else "Unknown" for c in contributors] if contributors else None
+      if dict_repo['size'] > 0 and repo['defaultBranchRef']:
+        repo_state = self.__get_repo_state(dict_org_state, dict_repo['full_name'], repo['pushedAt'])
+        dict_new_state[dict_repo['full_name']] = repo_state
 
         # Dependabot alerts (only if the repo is NOT archived)
+        # If Vulnerability alerts are NOT enabled, there is nothing to report
+        lst_fields = ['commit_count', 'contributors', 'release_count']
         if dict_repo['archived'] is False:
-          dependabot_alerts = self.__enumerate_dependabot_alerts(obj_repo)
-          if dependabot_alerts and len(dependabot_alerts) > 0:
-            repo_with_sec_alert_counts += 1
-
-          dict_repo['dependabot_alerts'] = dependabot_alerts
+          if repo['hasVulnerabilityAlertsEnabled'] is False:
+            self.__set_repo_field(repo_state, 'dependabot_alerts', None)
+          else:
+            lst_fields.append('dependabot_alerts')
 
-        # Releases (count)
-        releases = obj_repo.get_releases()
-        self._inc_api_call()
-        dict_repo['release_count'] = len([r for r in releases])
+        lst_expired = [field for field in lst_fields if self.__is_expired(dict_repo['full_name'], repo_state, field)]
+        lst_jobs.append((dict_repo, repo_state, lst_expired))
 
       else:
         # Empty repo
@@ -155,6 +420,27 @@ class Github(Platform):
       # Done. Affix and next
       dict_repos['content'].append(dict_repo)
 
+    # Only the details that may have changed are fetched
+    self._logger.info(f"Fetching details of {len([job for job in lst_jobs if job[2]])} of {repo_count} repositories")
+    self.__fetch_repo_details(org, lst_jobs)
+    self.__fetch_repo_contributors(lst_jobs)
+
+    for dict_repo, repo_state, lst_expired in lst_jobs:
+      # Details that could not be fetched (yet)
+      dict_repo.update({'commit_count': 0, 'contributors': None, 'release_count': 0})
+
+      for field, dict_field in repo_state['fields'].items():
+        if field == 'dependabot_alerts' and dict_repo['archived'] is True:
+          continue
+        dict_repo[field] = dict_field['value']
+
+      if dict_repo.get('dependabot_alerts'):
+        repo_with_sec_alert_counts += 1
+
+    # Forget repositories that are gone, or empty
+    dict_state[org] = dict_new_state
+    self._save_state('github_repos', dict_state)
+
     # Add totals
     dict_repos['meta']['repo_count'] = repo_count
     dict_repos['meta']['repo_stale_count'] = repo_stale_count
@@ -200,6 +486,68 @@ class Github(Platform):
     dict_teams['meta']['team_count'] = team_count
     return dict_teams
 
+  def __get_last_active(self, logins):
+    # Last activity of users, as {login: date of their last contribution, or None}.
+    # Instead of a request per user, users are asked for in batches through GraphQL. Per user, the outcome is kept
+    # in state, and users checked within 'user_activity_ttl_hours' are not asked for again. The others are only
+    # asked for the contributions since their last known activity (at most a year back, the limit of the API).
+    ttl_hours = self.__config['user_activity_ttl_hours'] if 'user_activity_ttl_hours' in self.__config else 24
+
+    dict_state = self._load_state('github_users')
+    dict_org_state = dict_state[self.__org] if self.__org in dict_state else dict()
+
+    now = datetime.now(timezone.utc)
+    year_ago = now - relativedelta(years=1) + relativedelta(days=1)
+
+    lst_refresh = list()
+    for login in logins:
+      if login not in dict_org_state or parser.parse(dict_org_state[login]['checked_at']) < now - relativedelta(hours=ttl_hours):
+        lst_refresh.append(login)
+
+    self._logger.info(f'Fetching activity of {len(lst_refresh)} of {len(logins)} users')
+
+    for start in range(0, len(lst_refresh), self.__activity_batch_size):
+      batch = lst_refresh[start:start + self.__activity_batch_size]
+
+      lst_params = list()
+      lst_fields = list()
+      variables = dict()
+      for index, login in enumerate(batch):
+        since = year_ago
+        if login in dict_org_state and dict_org_state[login]['last_active']:
+          since = max(year_ago, parser.parse(dict_org_state[login]['last_active']).replace(tzinfo=timezone.utc))
+
+        lst_params.append(f'$login{index}: String!, $from{index}: DateTime')
+        lst_fields.append(self.__activity_query.replace('INDEX', str(index)))
+        variables[f'login{index}'] = login
+        variables[f'from{index}'] = since.isoformat()
+
+      query = f"query({', '.join(lst_params)}) {{ {' '.join(lst_fields)} }}"
+      data = self.__graphql(query, variables)
+
+      for index, login in enumerate(batch):
+        user = data[f'user{index}'] if f'user{index}' in data else None
+        if user is None:
+          # Unknown to GraphQL (e.g. renamed in the meantime); try again on the next run
+          continue
+
+        dict_user_state = dict_org_state[login] if login in dict_org_state else {'last_active': None}
+
+        lst_active_days = [day['date']
+                           for week in user['contributionsCollection']['contributionCalendar']['weeks']
+                           for day in week['contributionDays'] if day['contributionCount'] > 0]
+        if lst_active_days:
+          dict_user_state['last_active'] = max(lst_active_days)
+
+        dict_user_state['checked_at'] = now.isoformat()
+        dict_org_state[login] = dict_user_state
+
+    # Forget users that are no longer part of the organization
+    dict_state[self.__org] = {login: dict_org_state[login] for login in logins if login in dict_org_state}
+    self._save_state('github_users', dict_state)
+
+    return {login: dict_org_state[login]['last_active'] if login in dict_org_state else None for login in logins}
+
   def __enumerate_users(self):
     # Return both members of the organisation and outside collaborators
 
@@ -215,85 +563,49 @@ class Github(Platform):
     collaborators = self.__obj_org.get_outside_collaborators()
     self._inc_api_call()
 
-    # Get all members that have no 2FA enabled
-    users_no2fa = self.__obj_org.get_members(filter_='2fa_disabled')
+    # Get all members and collaborators that have no 2FA enabled, for lookups by login
+    set_users_no2fa = set()
+    for user in self.__obj_org.get_members(filter_='2fa_disabled'):
+      set_users_no2fa.add(user.login)
     self._inc_api_call()
 
-    # Get all collaborators that have no 2FA enabled
-    collaborators_no2fa = self.__obj_org.get_outside_collaborators(filter_='2fa_disabled')
+    for user in self.__obj_org.get_outside_collaborators(filter_='2fa_disabled'):
+      set_users_no2fa.add(user.login)
     self._inc_api_call()
-    lst_users_no2fa = list()
-
-    # Add No2FA users and collaborators to a simple list
-    for user in users_no2fa:
-      lst_users_no2fa.append(user.login)
-
-    for user in collaborators_no2fa:
-      lst_users_no2fa.append(user.login)
 
     # Let's go
     user_filter = ['login', 'html_url', 'avatar_url', 'type']
     member_count = 0
     collaborator_count = 0
-
-    # Members of the organisation
     users_no2fa_count = 0
-    for user in users:
-      member_count += 1
 
-      # Default fields
-      dict_user = self._filter_fields(user, user_filter)
-
-      # Last active
-      events = user.get_events()
-      self._inc_api_call()
-
-      last_active = None
-      for event in events:
-        last_active = event.last_modified
-        break
-
-      dict_user['last_active'] = last_active
-
-      # 2FA disabled
-      dict_user['2fa_disabled'] = False
-      if dict_user['login'] in lst_users_no2fa:
-        users_no2fa_count += 1
-        dict_user['2fa_disabled'] = True
-
-      # add to main
-      dict_users['content'].append(dict_user)
-
-    # Outside Collaborators
-    for user in collaborators:
-      collaborator_count += 1
+    # Members of the organisation, then outside collaborators
+    for user, outside_collaborator in [(user, False) for user in users] + [(user, True) for user in collaborators]:
+      if outside_collaborator:
+        collaborator_count += 1
+      else:
+        member_count += 1
 
       # Default fields
       dict_user = self._filter_fields(user, user_filter)
 
       # Is collaborator
-      dict_user['outside_collaborator'] = True
-
-      # Last active
-      events = user.get_events()
-      self._inc_api_call()
-
-      last_active = None
-      for event in events:
-        last_active = event.last_modified
-        break
-
-      dict_user['last_active'] = last_active
+      if outside_collaborator:
+        dict_user['outside_collaborator'] = True
 
       # 2FA disabled
-      dict_user['2fa_disabled'] = False
-      if dict_user['login'] in lst_users_no2fa:
+      dict_user['2fa_disabled'] = dict_user['login'] in set_users_no2fa
+      if dict_user['2fa_disabled']:
         users_no2fa_count += 1
-        dict_user['2fa_disabled'] = True
 
       # add to main
       dict_users['content'].append(dict_user)
 
+    # Last active, for all users at once
+    dict_last_active = self.__get_last_active([user['login'] for user in dict_users['content']])
+    for dict_user in dict_users['content']:
+      dict_user['last_active'] = dict_last_active[dict_user['login']]
+
     # Sort the whole list of users on login name
     # This mixes both members and collaborators
     dict_users['content'] = sorted(dict_users['content'], key=lambda d: d['login'].lower())
@@ -306,17 +618,20 @@ class Github(Platform):
 
 
   def __markdown_repos(self, org: str, dict_repos: dict):
-    lst_content = list()
+    # The lines of the page are produced while it is written, so the page is never held in memory as a whole
+    file = f"github/{org}/repositories.md"
+    return {file: self.__repo_lines(dict_repos)}
 
+  def __repo_lines(self, dict_repos: dict):
     # Info block
-    lst_content.append(">[!info] General information")
-    lst_content.append(self._item('Repositories total', dict_repos['meta']['repo_count']))
-    lst_content.append(self._item('Private', dict_repos['meta']['repo_private_count']))
-    lst_content.append(self._item('Archived', dict_repos['meta']['repo_archived_count']))
-    lst_content.append(self._item('Stale', dict_repos['meta']['repo_stale_count']))
-    lst_content.append(self._item('With Dependabot alerts', dict_repos['meta']['repo_with_sec_alerts_count']))
-    lst_content.append(self._item('Total size', self._format_bytes(dict_repos['meta']['repo_total_size'] * 1024)))
-    lst_content.append("")
+    yield ">[!info] General information"
+    yield self._item('Repositories total', dict_repos['meta']['repo_count'])
+    yield self._item('Private', dict_repos['meta']['repo_private_count'])
+    yield self._item('Archived', dict_repos['meta']['repo_archived_count'])
+    yield self._item('Stale', dict_repos['meta']['repo_stale_count'])
+    yield self._item('With Dependabot alerts', dict_repos['meta']['repo_with_sec_alerts_count'])
+    yield self._item('Total size', self._format_bytes(dict_repos['meta']['repo_total_size'] * 1024))
+    yield ""
 
     for repo in dict_repos['content']:
       # Handling labels
@@ -337,20 +652,23 @@ class Github(Platform):
       if repo['size'] == 0:
         label_empty = self._highlight('Empty', color='orange', border_color='orange')
 
-      lst_content.append(self._header(f"{repo['name']} {label_private} {label_empty} {label_archived}{label_stale}", size=4))
+      yield self._header(f"{repo['name']} {label_private} {label_empty} {label_archived}{label_stale}", size=4)
 
       if repo['description']:
-        lst_content.append(self._highlight(repo['description'], 'gray', weight='normal'))
-      lst_content.append(self._item('URL', repo['html_url']))
-      lst_content.append(self._item('Default branch', repo['default_branch']))
-      lst_content.append(self._item('Commits', repo['commit_count']))
-      lst_content.append(self._item('Last push', self._format_date(repo['pushed_at'])))
-      lst_content.append(self._item('Size', self._format_bytes(repo['size'] * 1024)))
-      lst_content.append(self._item('Releases', repo['release_count']))
+        yield self._highlight(repo['description'], 'gray', weight='normal')
+      yield self._item('URL', repo['html_url'])
+      yield self._item('Default branch', repo['default_branch'])
+      yield self._item('Commits', repo['commit_count'])
+      yield self._item('Last push', self._format_date(repo['pushed_at']))
+      yield self._item('Size', self._format_bytes(repo['size'] * 1024))
+      yield self._item('Releases', repo['release_count'])
+      yield self._item('Tags', repo['tag_count'])
+      yield self._item('Branches', repo['branch_count'])
+      yield self._item('Open pull requests', repo['open_pr_count'])
       contributors = '-'
       if repo['contributors']:
         contributors = ', '.join([c for c in repo['contributors']])
-      lst_content.append(self._item('Contributors', contributors))
+      yield self._item('Contributors', contributors)
 
       # Dependabot alerts
       severity_to_color = {
@@ -368,9 +686,9 @@ class Github(Platform):
           if len(repo['dependabot_alerts']):
             dependabot_alerts = ''
             for alert in repo['dependabot_alerts']:
-              button_color = severity_to_color[alert['security_vulnerability'].severity][0]
-              text_color = severity_to_color[alert['security_vulnerability'].severity][1]
-              button = self._highlight(alert['security_vulnerability'].package.name, color=text_color, background=button_color, weight='normal')
+              button_color = severity_to_color[alert['severity']][0]
+              text_color = severity_to_color[alert['severity']][1]
+              button = self._highlight(alert['package'], color=text_color, background=button_color, weight='normal')
 
               dependabot_alerts += f"{button} "
           else:
@@ -378,10 +696,7 @@ class Github(Platform):
 
 
         link = self._link(f"{repo['html_url']}/security/dependabot", 'Dependabot alerts')
-        lst_content.append(self._item(link, dependabot_alerts))
-
-    file = f"github/{org}/repositories.md"
-    return {file: lst_content}
+        yield self._item(link, dependabot_alerts)
 
   def __markdown_teams_and_users(self, org: str, teams: dict, users: dict):
     lst_content = list()
@@ -433,21 +748,28 @@ class Github(Platform):
 
 
   def _build_content(self):
-    md_main = dict()
+    # Pages are handed over per organization, so only one organization is held in memory at a time
+    for org, gh_token in self.__orgs:
+      self._logger.info(f'Organization {org}')
+      self.__set_org(org, gh_token)
 
-    self._logger.debug(self.__github_api.get_rate_limit())
+      rate_limit = self.__github_api.get_rate_limit()
+      self._logger.debug(rate_limit)
+      self.__update_budget(rate_limit)
 
-    repos = self.__enumerate_repos(self.__org)
-    md_main.update(self.__markdown_repos(self.__org, repos))
+      repos = self.__enumerate_repos(self.__org)
+      yield from self.__markdown_repos(self.__org, repos).items()
+      del repos
 
-    teams = self.__enumerate_teams()
-    users = self.__enumerate_users()
-    md_main.update(self.__markdown_teams_and_users(self.__org, teams, users))
+      teams = self.__enumerate_teams()
+      users = self.__enumerate_users()
+      yield from self.__markdown_teams_and_users(self.__org, teams, users).items()
 
-    self._logger.debug(self.__github_api.get_rate_limit())
+      self._logger.debug(self.__github_api.get_rate_limit())
 
-    return md_main
+      self.__github_api.close()
 
 
   def __del__(self):
-    self.__github_api.close()
+    if self.__github_api:
+      self.__github_api.close()
@@ -57,14 +57,14 @@ class Grafana(Platform):
 
     dict_return['meta']['team_count'] = len(teams)
 
+    # Get the members of all teams concurrently
+    urls_members = [f'{self.__api_host}/teams/{team['id']}/members' for team in teams]
+    lst_members = self._get_json_from_urls(urls_members, headers=self.__headers)
+
     field_filter = ['name', 'avatarUrl', 'memberCount']
-    for team in teams:
+    for team, members in zip(teams, lst_members):
       dict_team = self._filter_fields(team, field_filter)
 
-      # Get team members
-      url_members = f'{self.__api_host}/teams/{team['id']}/members'
-      members = self._get_json_from_url(url_members, headers=self.__headers)
-
       dict_team['members'] = [member['name'] for member in members]
 
       dict_return['content'].append(dict_team)
@@ -77,12 +77,12 @@ class Grafana(Platform):
 
     folder_field_filter = ['id', 'uid', 'title', 'url', 'created', 'updated']
 
-    dict_folders = dict()
-    for folder in folders:
-      # Get specific folder data
-      url_this_folder = f'{self.__api_host}/folders/{folder['uid']}'
-      this_folder = self._get_json_from_url(url_this_folder, headers=self.__headers)
+    # Get specific folder data, for all folders concurrently
+    urls_folders = [f'{self.__api_host}/folders/{folder['uid']}' for folder in folders]
+    lst_folders = self._get_json_from_urls(urls_folders, headers=self.__headers)
 
+    dict_folders = dict()
+    for folder, this_folder in zip(folders, lst_folders):
       dict_folder = self._filter_fields(this_folder, folder_field_filter)
       dict_folder['dashboards'] = list()
 
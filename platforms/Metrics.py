@@ -0,0 +1,210 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+class Metrics:
+    # Performance metrics of one platform run.
+    #
+    # The run is split into phases: 'fetch' (API requests), 'transform' (everything else the platform does),
+    # 'render' (building Markdown) and 'export' (writing pages). Phases are exclusive and nest: a request made
+    # while rendering counts as fetch, not as render. Only the thread that runs the platform is timed,
+    # so work that overlaps in worker threads is not counted twice.
+
+    phases = ['fetch', 'transform', 'render', 'export']
+
+    # Upper bounds (seconds) of the latency histogram buckets
+    latency_buckets = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+    # Beyond this many endpoints, requests are counted per host only
+    max_endpoints = 100
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+
+        self.__phase_times = {phase: 0 for phase in self.phases}
+        self.__owner = None
+        self.__stack = list()
+        self.__mark = None
+
+        self.__endpoints = dict()
+        self.__counters = {
+            'retries': 0,
+            'bytes_received': 0,
+            'pages_written': 0,
+            'pages_skipped': 0
+        }
+
+    def start(self):
+        # Starts timing on the current thread. Time not spent in any other phase is 'transform'.
+        self.__owner = threading.get_ident()
+        self.__stack = ['transform']
+        self.__mark = time.perf_counter()
+
+    def stop(self):
+        self.__switch()
+        self.__stack = list()
+        self.__owner = None
+
+    def __switch(self):
+        # Books the time since the last switch on the current phase
+        now = time.perf_counter()
+        if self.__stack:
+            self.__phase_times[self.__stack[-1]] += now - self.__mark
+        self.__mark = now
+
+    @contextmanager
+    def phase(self, name):
+        if threading.get_ident() != self.__owner:
+            yield
+            return
+
+        self.__switch()
+        self.__stack.append(name)
+        try:
+            yield
+        finally:
+            self.__switch()
+            self.__stack.pop()
+
+    @staticmethod
+    def __endpoint_name(method, url):
+        # Identifiers (anything with digits or capitals, or very long) are left out of the path,
+        # so e.g. all users of an API end up on the same endpoint
+        parts = urlsplit(url)
+        segments = ['{id}' if re.search(r'[0-9A-Z]', segment) or len(segment) > 32 else segment
+                    for segment in parts.path.split('/')]
+
+        return f"{method} {parts.netloc}{'/'.join(segments)}"
+
+    def add_request(self, method, url, status_code, seconds, size):
+        endpoint = self.__endpoint_name(method, url)
+
+        with self.__lock:
+            if endpoint not in self.__endpoints and len(self.__endpoints) >= self.max_endpoints:
+                endpoint = f"{method} {urlsplit(url).netloc}/(other)"
+
+            if endpoint not in self.__endpoints:
+                self.__endpoints[endpoint] = {
+                    'calls': 0,
+                    'errors': 0,
+                    'bytes': 0,
+                    'latency_sum': 0,
+                    'latency_buckets': [0] * (len(self.latency_buckets) + 1)
+                }
+
+            dict_endpoint = self.__endpoints[endpoint]
+            dict_endpoint['calls'] += 1
+            dict_endpoint['bytes'] += size
+            dict_endpoint['latency_sum'] += seconds
+            if status_code >= 400:
+                dict_endpoint['errors'] += 1
+
+            # The last bucket is +Inf
+            bucket = len(self.latency_buckets)
+            for index, bound in enumerate(self.latency_buckets):
+                if seconds <= bound:
+                    bucket = index
+                    break
+            dict_endpoint['latency_buckets'][bucket] += 1
+
+            self.__counters['bytes_received'] += size
+
+    def inc(self, counter, incr=1):
+        with self.__lock:
+            self.__counters[counter] += incr
+
+    def to_dict(self):
+        with self.__lock:
+            dict_endpoints = dict()
+            for endpoint, values in sorted(self.__endpoints.items()):
+                # Cumulative counts per upper bound, as in Prometheus
+                dict_buckets = dict()
+                count = 0
+                for bound, bucket_count in zip(self.latency_buckets + ['+Inf'], values['latency_buckets']):
+                    count += bucket_count
+                    dict_buckets[str(bound)] = count
+
+                dict_endpoints[endpoint] = {
+                    'calls': values['calls'],
+                    'errors': values['errors'],
+                    'bytes': values['bytes'],
+                    'latency_sum': round(values['latency_sum'], 3),
+                    'latency_buckets': dict_buckets
+                }
+
+            return {
+                'phases': {phase: round(seconds, 3) for phase, seconds in self.__phase_times.items()},
+                'endpoints': dict_endpoints,
+                **self.__counters
+            }
+
+    @staticmethod
+    def __escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    @staticmethod
+    def to_prometheus(dict_platforms):
+        # Renders the metrics of the last run of every platform in the Prometheus text format,
+        # e.g. for the textfile collector of the node exporter.
+        # dict_platforms: {platform: metrics as reported by Inventoryst}
+        esc = Metrics.__escape
+
+        # (name, help, key in the platform metrics)
+        lst_gauges = [
+            ('inventoryst_success', 'Whether the last run succeeded', 'success'),
+            ('inventoryst_duration_seconds', 'Duration of the last run', 'duration'),
+            ('inventoryst_memory_usage_bytes', 'Growth of the process memory during the last run', 'memory_usage'),
+            ('inventoryst_api_calls', 'API calls made in the last run', 'api_calls'),
+            ('inventoryst_retries', 'Rate limited requests retried in the last run', 'retries'),
+            ('inventoryst_rate_limit_wait_seconds', 'Time spent waiting on rate limits in the last run',
+             'rate_limit_wait'),
+            ('inventoryst_cache_hits', 'Responses served from the cache in the last run', 'cache_hits'),
+            ('inventoryst_received_bytes', 'Bytes received from APIs in the last run', 'bytes_received'),
+            ('inventoryst_written_bytes', 'Bytes written to pages in the last run', 'bytes_written'),
+            ('inventoryst_pages_written', 'Pages written in the last run', 'pages_written'),
+            ('inventoryst_pages_skipped', 'Pages left as they were in the last run', 'pages_skipped'),
+            ('inventoryst_pages_swept', 'Stale pages archived or deleted in the last run', 'pages_swept')
+        ]
+
+        lst_lines = list()
+        for name, description, key in lst_gauges:
+            lst_lines.append(f'# HELP {name} {description}')
+            lst_lines.append(f'# TYPE {name} gauge')
+            for platform, metrics in dict_platforms.items():
+                if key in metrics:
+                    lst_lines.append(f'{name}{{platform="{esc(platform)}"}} {metrics[key]}')
+
+        lst_lines.append('# HELP inventoryst_phase_duration_seconds Time spent per phase of the last run')
+        lst_lines.append('# TYPE inventoryst_phase_duration_seconds gauge')
+        for platform, metrics in dict_platforms.items():
+            for phase, seconds in metrics.get('phases', dict()).items():
+                lst_lines.append(f'inventoryst_phase_duration_seconds{{platform="{esc(platform)}",phase="{phase}"}} '
+                                 f'{seconds}')
+
+        lst_endpoint_gauges = [
+            ('inventoryst_endpoint_calls', 'API calls per endpoint in the last run', 'calls'),
+            ('inventoryst_endpoint_errors', 'Failed API calls per endpoint in the last run', 'errors'),
+            ('inventoryst_endpoint_received_bytes', 'Bytes received per endpoint in the last run', 'bytes')
+        ]
+        for name, description, key in lst_endpoint_gauges:
+            lst_lines.append(f'# HELP {name} {description}')
+            lst_lines.append(f'# TYPE {name} gauge')
+            for platform, metrics in dict_platforms.items():
+                for endpoint, values in metrics.get('endpoints', dict()).items():
+                    lst_lines.append(f'{name}{{platform="{esc(platform)}",endpoint="{esc(endpoint)}"}} {values[key]}')
+
+        name = 'inventoryst_endpoint_latency_seconds'
+        lst_lines.append(f'# HELP {name} Latency of API calls per endpoint in the last run')
+        lst_lines.append(f'# TYPE {name} histogram')
+        for platform, metrics in dict_platforms.items():
+            for endpoint, values in metrics.get('endpoints', dict()).items():
+                labels = f'platform="{esc(platform)}",endpoint="{esc(endpoint)}"'
+                for bound, count in values['latency_buckets'].items():
+                    lst_lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lst_lines.append(f'{name}_sum{{{labels}}} {values["latency_sum"]}')
+                lst_lines.append(f'{name}_count{{{labels}}} {values["calls"]}')
+
+        return '\n'.join(lst_lines) + '\n'
@@ -88,22 +88,14 @@ class Netlify(Platform):
         file = "netlify/members.md"
         return {file: lst_content}
 
-    def __get_env_vars_for_site(self, site_id):
-        url_env_vars = self.__api_url + f'/accounts/{self.__team}/env?site_id={site_id}'
-        lst_env_vars = self._get_json_from_url(url=url_env_vars, headers=self.__headers)
-
+    def __get_env_vars_for_site(self, lst_env_vars):
         lst_return = list()
         if len(lst_env_vars) > 0:
             lst_return = [item['key'] for item in lst_env_vars]
 
         return sorted(lst_return)
 
-    def __get_deploys_for_site(self, site_id):
-        # Get last 5 production deploys
-        last_deploys = self.__config['last_deploys']
-        url_deploys = self.__api_url + f'/sites/{site_id}/deploys?production=true&per_page={last_deploys}'
-        lst_deploys = self._get_json_from_url(url=url_deploys, headers=self.__headers)
-
+    def __get_deploys_for_site(self, lst_deploys):
         lst_deploys = sorted(lst_deploys, key=lambda item: item["created_at"], reverse=True)
 
         field_filter = ['created_at', 'id', 'state', 'error_message']
@@ -114,11 +106,22 @@ class Netlify(Platform):
 
         return lst_return
 
-    def __get_ssl_cert(self, site_id):
-        url_cert = self.__api_url + f'/sites/{site_id}/ssl'
-        dict_cert = self._get_json_from_url(url=url_cert, headers=self.__headers)
+    def __get_site_details(self, lst_sites):
+        # Per site, we need the env vars, the last production deploys and the TLS certificate.
+        # These are fetched concurrently for all sites at once.
+        last_deploys = self.__config['last_deploys']
 
-        return dict_cert
+        urls = list()
+        for site in lst_sites:
+            site_id = site['site_id']
+            urls.append(self.__api_url + f'/accounts/{self.__team}/env?site_id={site_id}')
+            urls.append(self.__api_url + f'/sites/{site_id}/deploys?production=true&per_page={last_deploys}')
+            urls.append(self.__api_url + f'/sites/{site_id}/ssl')
+
+        results = self._get_json_from_urls(urls, headers=self.__headers)
+
+        # Three results per site, in the order requested above
+        return [results[i:i + 3] for i in range(0, len(results), 3)]
 
     def __enumerate_sites(self):
         dict_sites = dict()
@@ -132,8 +135,10 @@ class Netlify(Platform):
         dict_sites["meta"]["site_count_disabled"] = 0
         dict_sites["meta"]["site_count_undeployed"] = 0
 
+        lst_site_details = self.__get_site_details(lst_sites)
+
         field_filter = ['created_at', 'default_domain', 'custom_domain', 'site_id', 'name', 'ssl_url', 'disabled']
-        for site in lst_sites:
+        for site, (lst_env_vars, lst_deploys, dict_cert) in zip(lst_sites, lst_site_details):
 
             dict_site = self._filter_fields(site, field_filter)
 
@@ -147,17 +152,16 @@ class Netlify(Platform):
                 dict_site['updated'] = self._format_date(site['build_settings']['updated_at'])
 
             # Environment variables
-            dict_site['env_vars'] = ", ".join(self.__get_env_vars_for_site(site['site_id']))
+            dict_site['env_vars'] = ", ".join(self.__get_env_vars_for_site(lst_env_vars))
 
             # Deploys
-            lst_deploys = self.__get_deploys_for_site(site['site_id'])
+            lst_deploys = self.__get_deploys_for_site(lst_deploys)
             if len(lst_deploys) > 0:
                 dict_site['deploys'] = lst_deploys
             else:
                 dict_sites["meta"]["site_count_undeployed"] += 1
 
             # TLS certificate
-            dict_cert = self.__get_ssl_cert(site['site_id'])
             if dict_cert:
                 dict_site['tls_cert'] = dict_cert
 
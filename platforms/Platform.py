@@ -1,12 +1,72 @@
+import asyncio
 import datetime
+import functools
 import hashlib
+import json
 import logging
 import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode, quote
 from dateutil import parser
+import httpx
 import requests
-import yaml
+from requests.adapters import HTTPAdapter
+from .Config import Config
+from .Metrics import Metrics
+from .ResponseCache import ResponseCache
+from .RateGovernor import RateGovernor
 
 class Platform:
+    # Set to False (--no-cache) to bypass the HTTP response cache for this process
+    cache_enabled = True
+
+    # Set to True (--sweep-dry-run) to only log which pages would be archived or deleted
+    sweep_dry_run = False
+
+    # Set to True (--daemon) to keep the HTTP session, response cache and rate limit governor of a platform
+    # for its next run, instead of closing them at the end of inventorize()
+    keep_warm = False
+    __warm = dict()
+    __warm_lock = threading.Lock()
+
+    # Default rate limits per host, as {host: {'requests': N, 'per': seconds, 'burst': B}}.
+    # Child classes declare the documented limits of their APIs here; 'rate_limits' in the
+    # platform's config section overrides them per host.
+    _rate_limits = dict()
+
+    # Content hashes of the pages written, per output directory: {base_path: {page: {hash, size, mtime}}}.
+    # Platforms run in parallel and share the output directory, hence the lock.
+    __manifests = dict()
+    __manifest_lock = threading.Lock()
+
+    # Creating and removing directories in the output directory is done under this lock, as platforms share it
+    __directories_lock = threading.Lock()
+
+    # Set by the benchmarks (benchmarks/) to run platforms offline:
+    #   - url_rewrite: callable(url) returning the url to send the request to instead, e.g. a local replay server
+    #   - recorder:    callable(platform, method, url, data, response), handed every response, to capture fixtures
+    url_rewrite = None
+    recorder = None
+
+    def __init_subclass__(cls, **kwargs):
+        # Building Markdown ('__markdown_*' and '__*_to_markdown' methods) is timed as the 'render' phase
+        super().__init_subclass__(**kwargs)
+        for name, method in list(cls.__dict__.items()):
+            if callable(method) and 'markdown' in name:
+                setattr(cls, name, Platform.__render_phase(method))
+
+    @staticmethod
+    def __render_phase(method):
+        @functools.wraps(method)
+        def render(self, *args, **kwargs):
+            with self._phase('render'):
+                return method(self, *args, **kwargs)
+
+        return render
+
     def __init__(self):
         self._now = datetime.datetime.now(tz=datetime.timezone.utc)
 
@@ -19,29 +79,278 @@ class Platform:
 
         # Misc
         self.__page_properties = dict()
+        self.__front_matter = None
         self.__pages_changed = 0
+        self.__pages_swept = 0
+        self.__bytes_written = 0
+        self.__syscalls_saved = 0
+
+        # Directories known to exist in the output directory, so we only create (or check) them once per run.
+        # Only per run, as in daemon mode they can be removed in between.
+        self.__directories = set()
         self.__api_calls = 0
+        self.__api_calls_lock = threading.Lock()
+        self.__metrics = Metrics()
+
+        # HTTP session, created on first use and closed at the end of inventorize()
+        self.__session = None
+        self.__session_lock = threading.Lock()
+
+        # HTTP response cache, opened on first use and closed at the end of inventorize()
+        self.__cache = None
+        self.__cache_lock = threading.Lock()
+        self.__cache_hits = 0
+
+        # Identity of the credentials the responses are cached under; see _set_credential_identity()
+        self.__credential_identity = None
+
+        # Rate limit governor, created on first use
+        self.__governor = None
+        self.__governor_lock = threading.Lock()
+        self.__rate_limit_wait = 0
+
+        # Pick up where the previous run of this platform left off
+        if Platform.keep_warm:
+            with Platform.__warm_lock:
+                dict_warm = Platform.__warm.pop(type(self).__name__, dict())
+
+            self.__session = dict_warm.get('session')
+            self.__cache = dict_warm.get('cache')
+            self.__governor = dict_warm.get('governor')
+
+    def __create_session(self):
+        # Tunables live under 'http' in the general section of the config
+        http_config = self.__config['http'] if 'http' in self.__config else dict()
+
+        session = requests.Session()
+
+        # Connection pool: 'pool_connections' is the number of hosts we keep pools for,
+        # 'pool_size' is the number of connections kept alive per host
+        adapter = HTTPAdapter(pool_connections=http_config.get('pool_connections', 10),
+                              pool_maxsize=http_config.get('pool_size', 10))
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        # Keep-alive is on by default; without it, every request does a new TCP+TLS handshake
+        if http_config.get('keep_alive', True) is False:
+            session.headers['Connection'] = 'close'
+
+        # Let the server compress responses; requests decompresses them transparently
+        if http_config.get('gzip', True) is True:
+            session.headers['Accept-Encoding'] = 'gzip, deflate'
+        else:
+            session.headers['Accept-Encoding'] = 'identity'
+
+        return session
+
+    def _get_session(self):
+        # Prefetch and worker threads ask for the session too; only one of them gets to create it
+        with self.__session_lock:
+            if self.__session is None:
+                self.__session = self.__create_session()
+
+        return self.__session
+
+    def __get_cache(self):
+        # Returns None when caching is disabled
+        cache_config = self.__config['cache'] if 'cache' in self.__config else dict()
+        if Platform.cache_enabled is False or cache_config.get('enabled', True) is False:
+            return None
+
+        with self.__cache_lock:
+            if self.__cache is None:
+                self.__cache = ResponseCache(cache_config.get('directory', 'cache'),
+                                             ttl_days=cache_config.get('ttl_days', 7),
+                                             max_size_mb=cache_config.get('max_size_mb', 512))
+
+        return self.__cache
+
+    def _set_credential_identity(self, *secrets):
+        # For platforms that trade a long lived secret for a new access token every run: responses are cached
+        # under (a hash of) the long lived secret, instead of under a token that is never sent again
+        self.__credential_identity = hashlib.sha256('\n'.join(secrets).encode()).hexdigest()
+
+    def __get_cache_scope(self, req_headers, auth):
+        # Everything besides the url a response depends on: credentials, API versions, etc.
+        if self.__credential_identity:
+            req_headers = {key: value for key, value in req_headers.items() if key.lower() != 'authorization'}
+            return str(sorted(req_headers.items())) + self.__credential_identity
+
+        return str(sorted(req_headers.items())) + str(auth)
+
+    def __inc_cache_hit(self):
+        with self.__api_calls_lock:
+            self.__cache_hits += 1
+
+    def get_cache_hits(self):
+        return self.__cache_hits
+
+    def __get_governor(self):
+        with self.__governor_lock:
+            if self.__governor is None:
+                http_config = self.__config['http'] if 'http' in self.__config else dict()
+
+                # Config sections are named after the platform
+                limits = dict(self._rate_limits)
+                try:
+                    platform_config = self.load_config(type(self).__name__.lower())
+                    if platform_config and 'rate_limits' in platform_config:
+                        limits.update(platform_config['rate_limits'])
+                except KeyError:
+                    pass
+
+                self.__governor = RateGovernor(limits,
+                                               max_retries=http_config.get('max_retries', 5),
+                                               backoff_base=http_config.get('backoff_base', 1),
+                                               backoff_max=http_config.get('backoff_max', 60))
+
+        return self.__governor
+
+    def __add_rate_limit_wait(self, seconds):
+        with self.__api_calls_lock:
+            self.__rate_limit_wait += seconds
+
+    def __wait(self, seconds):
+        if seconds > 0:
+            self.__add_rate_limit_wait(seconds)
+            time.sleep(seconds)
+
+    async def __wait_async(self, seconds):
+        if seconds > 0:
+            self.__add_rate_limit_wait(seconds)
+            await asyncio.sleep(seconds)
+
+    def _wait_for_rate_limit(self, seconds):
+        # For platforms that keep track of the rate limit budget of their API themselves
+        if seconds > 0:
+            self._logger.debug(f'Waiting {round(seconds, 2)}s for the rate limit')
+            with self._phase('fetch'):
+                self.__wait(seconds)
+
+    def _wait_before_retry(self, attempt, min_delay=0):
+        # For APIs that signal rate limiting in their payload: wait with jittered exponential backoff, but at least
+        # min_delay seconds. Returns False, without waiting, once 'max_retries' attempts have been made.
+        governor = self.__get_governor()
+        if attempt >= governor.get_max_retries():
+            return False
+
+        seconds = max(min_delay, governor.backoff(attempt))
+        self._logger.debug(f"Waiting {round(seconds, 2)}s before retrying (attempt {attempt + 1})")
+        self.__wait(seconds)
+        return True
+
+    def get_rate_limit_wait(self):
+        # Total number of seconds spent waiting on rate limits
+        return round(self.__rate_limit_wait, 2)
+
+    def _close(self):
+        if Platform.keep_warm:
+            # Hand everything over to the next run of this platform
+            if self.__cache is not None:
+                self.__cache.evict()
+
+            with Platform.__warm_lock:
+                Platform.__warm[type(self).__name__] = {
+                    'session': self.__session,
+                    'cache': self.__cache,
+                    'governor': self.__governor
+                }
+
+            self.__session = None
+            self.__cache = None
+            return
+
+        if self.__session is not None:
+            self.__session.close()
+            self.__session = None
+
+        if self.__cache is not None:
+            self.__cache.evict()
+            self.__cache.close()
+            self.__cache = None
+
+    @staticmethod
+    def release_warm():
+        # Closes everything that was kept warm, e.g. when the configuration it was created with changed
+        with Platform.__warm_lock:
+            for dict_warm in Platform.__warm.values():
+                if dict_warm['session'] is not None:
+                    dict_warm['session'].close()
+                if dict_warm['cache'] is not None:
+                    dict_warm['cache'].close()
+
+            Platform.__warm.clear()
+
+    def _rewrite_url(self, url):
+        # The url a request for url is actually sent to. Also for platforms that talk to an API through an SDK.
+        return Platform.url_rewrite(url) if Platform.url_rewrite else url
+
+    def _record(self, method, url, data, response):
+        if Platform.recorder:
+            Platform.recorder(type(self).__name__, method, url, data, response)
 
     def _get_json_from_url(self, url, headers=None, data=None, raw=False, auth=None, connection=None):
+        with self._phase('fetch'):
+            return self.__get_json_from_url(url, headers, data, raw, auth, connection)
+
+    def __get_json_from_url(self, url, headers, data, raw, auth, connection):
         # Basic headers
         req_headers = {
             'User-Agent': 'Inventoryst/1.0; https://github.com/unfoldingWord/inventoryst'
         }
 
+        # Only GET requests over our own session are cached
+        cache = self.__get_cache() if data is None and not connection else None
+
         if not connection:
-            connection = requests
+            connection = self._get_session()
 
         if headers:
             for header in headers:
                 req_headers[header[0]] = header[1]
 
-        if data is None:
-            result = connection.get(url, headers=req_headers, auth=auth)
-        else:
-            result = connection.post(url, json=data, headers=req_headers, auth=auth)
+        # Ask the server to only send the content if it has changed since we cached it
+        cache_key = cache_entry = None
+        if cache:
+            cache_key = cache.key('GET', url, self.__get_cache_scope(req_headers, auth))
+            cache_entry = cache.get(cache_key)
+            if cache_entry:
+                req_headers.update(cache.conditional_headers(cache_entry))
+
+        governor = self.__get_governor()
+        attempt = 0
+        while True:
+            self.__wait(governor.reserve(url))
+
+            start = time.perf_counter()
+            if data is None:
+                result = connection.get(self._rewrite_url(url), headers=req_headers, auth=auth)
+            else:
+                result = connection.post(self._rewrite_url(url), json=data, headers=req_headers, auth=auth)
+
+            self._inc_api_call()
+            self.__metrics.add_request('GET' if data is None else 'POST', url, result.status_code,
+                                       time.perf_counter() - start, len(result.content))
+            self._logger.debug(result)
 
-        self._inc_api_call()
-        self._logger.debug(result)
+            delay = governor.retry_delay(url, result.status_code, result.headers, attempt)
+            if delay is None:
+                break
+
+            self._logger.warning(f"Rate limited by '{urlparse(url).netloc}', retrying in {round(delay, 2)}s")
+            self.__metrics.inc('retries')
+            self.__wait(delay)
+            attempt += 1
+
+        if cache:
+            if result.status_code == 304 and cache_entry:
+                cache.touch(cache_key)
+                self.__inc_cache_hit()
+                result = cache.to_response(cache_entry, url)
+            elif result.status_code == 200:
+                cache.put(cache_key, result.status_code, result.headers, result.content)
+
+        self._record('GET' if data is None else 'POST', url, data, result)
 
         if raw:
             return result
@@ -50,23 +359,261 @@ class Platform:
         else:
             return None
 
+    async def _get_json_from_url_async(self, client, url, headers=None, data=None, raw=False, auth=None):
+        # Async counterpart of _get_json_from_url, to be used with an httpx.AsyncClient
+        req_headers = {
+            'User-Agent': 'Inventoryst/1.0; https://github.com/unfoldingWord/inventoryst'
+        }
+
+        if headers:
+            for header in headers:
+                req_headers[header[0]] = header[1]
+
+        cache = self.__get_cache() if data is None else None
+        cache_key = cache_entry = None
+        if cache:
+            cache_key = cache.key('GET', url, self.__get_cache_scope(req_headers, auth))
+            cache_entry = cache.get(cache_key)
+            if cache_entry:
+                req_headers.update(cache.conditional_headers(cache_entry))
+
+        governor = self.__get_governor()
+        attempt = 0
+        while True:
+            await self.__wait_async(governor.reserve(url))
+
+            start = time.perf_counter()
+            if data is None:
+                result = await client.get(self._rewrite_url(url), headers=req_headers, auth=auth)
+            else:
+                result = await client.post(self._rewrite_url(url), json=data, headers=req_headers, auth=auth)
+
+            self._inc_api_call()
+            self.__metrics.add_request('GET' if data is None else 'POST', url, result.status_code,
+                                       time.perf_counter() - start, len(result.content))
+            self._logger.debug(result)
+
+            delay = governor.retry_delay(url, result.status_code, result.headers, attempt)
+            if delay is None:
+                break
+
+            self._logger.warning(f"Rate limited by '{urlparse(url).netloc}', retrying in {round(delay, 2)}s")
+            self.__metrics.inc('retries')
+            await self.__wait_async(delay)
+            attempt += 1
+
+        if cache:
+            if result.status_code == 304 and cache_entry:
+                cache.touch(cache_key)
+                self.__inc_cache_hit()
+                result = httpx.Response(cache_entry['status'], headers=cache_entry['headers'],
+                                        content=cache_entry['body'], request=result.request)
+            elif result.status_code == 200:
+                cache.put(cache_key, result.status_code, result.headers, result.content)
+
+        self._record('GET' if data is None else 'POST', url, data, result)
+
+        if raw:
+            return result
+        elif result.is_success:
+            return result.json()
+        else:
+            return None
+
+    async def __gather_json_from_urls(self, urls, headers, raw, auth):
+        http_config = self.__config['http'] if 'http' in self.__config else dict()
+
+        # At most this many requests are in flight per host at any moment
+        max_per_host = http_config.get('max_concurrency_per_host', 8)
+        semaphores = dict()
+
+        limits = httpx.Limits(max_keepalive_connections=http_config.get('pool_size', 10))
+        accept_encoding = 'gzip, deflate' if http_config.get('gzip', True) is True else 'identity'
+
+        async with httpx.AsyncClient(limits=limits, follow_redirects=True,
+                                     headers={'Accept-Encoding': accept_encoding}) as client:
+
+            async def fetch(url):
+                host = urlparse(url).netloc
+                if host not in semaphores:
+                    semaphores[host] = asyncio.Semaphore(max_per_host)
+
+                async with semaphores[host]:
+                    return await self._get_json_from_url_async(client, url, headers=headers, raw=raw, auth=auth)
+
+            return await asyncio.gather(*[fetch(url) for url in urls])
+
+    def _get_json_from_urls(self, urls, headers=None, raw=False, auth=None):
+        # Fetch all urls concurrently. Results are returned in the same order as the urls.
+        if not urls:
+            return list()
+
+        with self._phase('fetch'):
+            return asyncio.run(self.__gather_json_from_urls(list(urls), headers, raw, auth))
+
+    @staticmethod
+    def __set_query_param(url, key, value):
+        parts = urlsplit(url)
+        query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != key]
+        query.append((key, str(value)))
+
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    @staticmethod
+    def __get_query_param(url, key, default=None):
+        for k, v in parse_qsl(urlsplit(url).query):
+            if k == key:
+                return v
+
+        return default
+
+    def __fetch_page(self, url, headers, auth, fetch, strict):
+        # Returns the payload of a page, together with the 'next' url from the Link header (if any)
+        if fetch:
+            return fetch(url), None
+
+        result = self._get_json_from_url(url, headers=headers, raw=True, auth=auth)
+        if not result:
+            if strict:
+                raise RuntimeError(f"Request for '{url}' returned {result.status_code}")
+
+            self._logger.warning(f"Pagination stopped, request for '{url}' returned {result.status_code}")
+            return None, None
+
+        link_next = result.links['next']['url'] if 'next' in result.links else None
+        return result.json(), link_next
+
+    def _paginate_pages(self, url, headers=None, items=None, scheme='next', next_key='next',
+                        page_param='page', token_param='next_page_token', page_size=None,
+                        fetch=None, prefetch=True, auth=None, strict=False):
+        # Walks all pages of a paginated API and yields the list of items per page.
+        #
+        # scheme: how to get to the next page
+        #   - 'link':  the url in the 'next' relation of the Link header (Github style)
+        #   - 'next':  the url in the payload field `next_key` (DockerHub, ReadTheDocs)
+        #   - 'token': the payload field `token_param`, sent back as query param of the same name (Zoom)
+        #   - 'page':  increment the query param `page_param`, until a page has less than `page_size` items
+        # items: the payload key holding the items, a callable extracting them, or None if the payload is the list
+        # fetch: optional callable(url) returning the payload, for non JSON APIs. Not usable with 'link'.
+        # prefetch: fetch the next page in the background while the current one is being processed
+        # strict: raise when a page can not be fetched, instead of ending the pagination there. For callers that
+        #   must tell an incomplete result from a complete one.
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        next_page = None
+
+        try:
+            payload, link_next = self.__fetch_page(url, headers, auth, fetch, strict)
+
+            while payload is not None:
+                if items is None:
+                    lst_items = payload
+                elif callable(items):
+                    lst_items = items(payload)
+                else:
+                    lst_items = payload[items] if items in payload else list()
+
+                if lst_items is None:
+                    lst_items = list()
+
+                # Work out the url of the next page
+                next_url = None
+                if scheme == 'link':
+                    next_url = link_next
+                elif scheme == 'next':
+                    next_url = payload[next_key] if next_key in payload else None
+                elif scheme == 'token':
+                    if token_param in payload and payload[token_param]:
+                        next_url = self.__set_query_param(url, token_param, payload[token_param])
+                elif scheme == 'page':
+                    if len(lst_items) > 0 and (page_size is None or len(lst_items) >= page_size):
+                        page = int(self.__get_query_param(url, page_param, 1))
+                        next_url = self.__set_query_param(url, page_param, page + 1)
+                else:
+                    raise ValueError(f"Unknown pagination scheme '{scheme}'")
+
+                # Start on the next page before handing out this one
+                if next_url and executor:
+                    next_page = executor.submit(self.__fetch_page, next_url, headers, auth, fetch, strict)
+
+                yield lst_items
+
+                if not next_url:
+                    break
+
+                url = next_url
+                if next_page:
+                    # Waiting for the prefetched page is fetching as well
+                    with self._phase('fetch'):
+                        payload, link_next = next_page.result()
+                    next_page = None
+                else:
+                    payload, link_next = self.__fetch_page(url, headers, auth, fetch, strict)
+
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def _paginate(self, url, **kwargs):
+        # Same as _paginate_pages, but yields the items one by one
+        for lst_items in self._paginate_pages(url, **kwargs):
+            yield from lst_items
+
     @staticmethod
     def load_config(platform):
-        # YAML file path
-        yaml_file = 'inventoryst.yaml'
+        # The configuration is parsed and validated once per process
+        return Config.get(platform)
+
+    def __get_state_path(self, name):
+        state_dir = self.__config['state_directory'] if 'state_directory' in self.__config else 'state'
+        return os.path.join(state_dir, f'{name}.json')
+
+    def _load_state(self, name):
+        # State is data a platform keeps between runs (e.g. to only fetch what has changed)
+        path = self.__get_state_path(name)
+        if not os.path.exists(path):
+            return dict()
 
-        # Reading YAML data from file
-        with open(yaml_file, 'r') as f:
-            return yaml.safe_load(f)[platform]
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _save_state(self, name, data):
+        path = self.__get_state_path(name)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        # Write to a temporary file first, so a crash never leaves half a state file behind
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f, default=str)
+        os.replace(path + '.tmp', path)
 
     def get_changed_page_count(self):
         return self.__pages_changed
 
+    def get_swept_page_count(self):
+        return self.__pages_swept
+
+    def _phase(self, name):
+        # Times a block of work as one of the phases of Metrics; for work the Platform can't attribute itself
+        return self.__metrics.phase(name)
+
+    def get_metrics(self):
+        return self.__metrics.to_dict()
+
+    def get_bytes_written(self):
+        return self.__bytes_written
+
+    def get_syscalls_saved(self):
+        # File system calls saved compared to checking, reading and rewriting every page, net of the calls the
+        # temporary files add. Syncing is left out: it is what 'fsync' asks for, not overhead.
+        return self.__syscalls_saved
+
     def get_api_calls(self):
         return self.__api_calls
 
     def _inc_api_call(self, incr=1):
-        self.__api_calls += incr
+        # Requests can be made from worker threads (e.g. page prefetching)
+        with self.__api_calls_lock:
+            self.__api_calls += incr
 
     def _get_output_dir(self):
         base_path = self.__config['output_directory']
@@ -178,9 +725,11 @@ class Platform:
 
     def _add_page_property(self, key, value):
         self.__page_properties[key] = value
+        self.__front_matter = None
 
     def __get_page_properties(self):
-        if len(self.__page_properties):
+        # The properties are the same for every page of a platform, so we render them once
+        if self.__front_matter is None:
             properties = ''
             for tproperty, value in self.__page_properties.items():
 
@@ -191,12 +740,9 @@ class Platform:
                     properties += tproperty + ': ' + value + "\n"
 
             self._logger.debug(properties.replace('\n', '/'))
-            return "---\n" + properties + "---\n"
-        else:
-            # Return empty property block.
-            # This only occurs when checking if a page is modified. When we actually write the page,
-            # it will always contain at least the 'modified' property
-            return "---\n" + "---\n"
+            self.__front_matter = "---\n" + properties + "---\n"
+
+        return self.__front_matter
 
     def __get_header_warning(self):
         str_message = (">[!warning] Important notice: this page is automatically generated\n"
@@ -210,14 +756,238 @@ class Platform:
         return str_message
 
     def __prep_page_content(self, main_content):
-        lst_page_content = list()
-        if self.__get_page_properties():
-            lst_page_content.append(self.__get_page_properties())
-        lst_page_content.append(self.__get_header_warning() + "\n")
-        lst_page_content.append("\n".join(main_content))
-        new_content = "".join(lst_page_content)
+        # Yields the page (without front matter) in chunks, so a page never has to be held in memory twice
+        yield self.__get_header_warning() + "\n"
+
+        if isinstance(main_content, list):
+            yield "\n".join(main_content)
+        else:
+            # Lines are produced while we write; that time is rendering
+            lines = iter(main_content)
+            first = True
+            while True:
+                with self._phase('render'):
+                    line = next(lines, None)
+                if line is None:
+                    break
+
+                yield line if first else "\n" + line
+                first = False
+
+    def __write_page(self, file, chunks, modified):
+        # Writes the page to file, and returns its hash.
+        # The 'modified' property changes with every write, so it is spliced into the front matter,
+        # but left out of the hash.
+        front_matter = self.__get_page_properties()
+        hash_new = hashlib.sha256(front_matter.encode())
+        file.write(front_matter[:-4] + 'modified: ' + modified + "\n---\n")
+
+        for chunk in chunks:
+            file.write(chunk)
+            hash_new.update(chunk.encode())
+
+        return hash_new.hexdigest()
+
+    def __hash_page(self, chunks):
+        # The hash __write_page would return, without writing anything
+        hash_new = hashlib.sha256(self.__get_page_properties().encode())
+        for chunk in chunks:
+            hash_new.update(chunk.encode())
+
+        return hash_new.hexdigest()
+
+    def __write_temp_page(self, f_tmp, chunks, modified, fsync_mode):
+        # Writes the page to a temporary file, and returns its hash and the stat of the file.
+        # When the page fails halfway (e.g. the generator producing its lines raises), the file is removed.
+        try:
+            with open(f_tmp, 'w') as md_file:
+                hash_new = self.__write_page(md_file, chunks, modified)
+
+                md_file.flush()
+                if fsync_mode == 'file':
+                    os.fsync(md_file.fileno())
+
+                # Renaming keeps size and mtime, so this is what the page will look like on disk
+                stat_new = os.fstat(md_file.fileno())
+        except BaseException:
+            try:
+                os.remove(f_tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+        return hash_new, stat_new
+
+    @staticmethod
+    def __get_page_hash(f_path):
+        # Hashes an existing page the same way __write_page does: everything but 'modified' in the front matter
+        hash_old = hashlib.sha256()
+        with open(f_path, 'r') as file:
+            in_front_matter = None
+            for line in file:
+                if in_front_matter is None:
+                    in_front_matter = line == "---\n"
+                elif in_front_matter and line == "---\n":
+                    in_front_matter = False
+                elif in_front_matter and line.startswith('modified: '):
+                    continue
+
+                hash_old.update(line.encode())
+                if in_front_matter is False:
+                    break
+
+            # Past the front matter, the rest of the page is hashed as is
+            for block in iter(lambda: file.read(65536), ''):
+                hash_old.update(block.encode())
+
+        return hash_old.hexdigest()
+
+    @staticmethod
+    def __get_pages(inventory):
+        # _build_content either returns {page: [lines]}, or yields (page, lines) pairs.
+        # The latter lets a platform hand over its pages one at a time; lines can be any iterable.
+        if isinstance(inventory, dict):
+            return inventory.items()
+
+        return inventory
+
+    def __get_staging_path(self, base_path):
+        # Temporary files of the pages of this platform. Outside the pages themselves, so a run that crashed
+        # leaves nothing behind among them, and cleared at the start of the next run.
+        return os.path.join(base_path, '.inventoryst-tmp', type(self).__name__)
+
+    @staticmethod
+    def __get_manifest_path(base_path):
+        return os.path.join(base_path, '.inventoryst-manifest.json')
+
+    def __load_manifest(self, base_path):
+        # The manifest is read once per output directory, and shared by all platforms writing to it
+        with Platform.__manifest_lock:
+            if base_path not in Platform.__manifests:
+                dict_manifest = dict()
+                manifest_path = self.__get_manifest_path(base_path)
+                if os.path.exists(manifest_path):
+                    try:
+                        with open(manifest_path, 'r') as f:
+                            dict_manifest = json.load(f)
+                    except ValueError:
+                        # Rebuilt from the pages themselves on this run
+                        self._logger.warning(f"Can not read manifest '{manifest_path}'. Ignoring it.")
+
+                Platform.__manifests[base_path] = dict_manifest
+
+    def __get_manifest_entry(self, base_path, page):
+        with Platform.__manifest_lock:
+            return Platform.__manifests[base_path].get(page)
+
+    def __set_manifest_entry(self, base_path, page, content_hash, stat):
+        with Platform.__manifest_lock:
+            Platform.__manifests[base_path][page] = {
+                'hash': content_hash,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime_ns,
+                'platform': type(self).__name__
+            }
+
+    def __save_manifest(self, base_path):
+        manifest_path = self.__get_manifest_path(base_path)
+        with Platform.__manifest_lock:
+            with open(manifest_path + '.tmp', 'w') as f:
+                json.dump(Platform.__manifests[base_path], f, indent=1, sort_keys=True)
+            os.replace(manifest_path + '.tmp', manifest_path)
+
+    def __get_old_page_hash(self, base_path, page, stat):
+        # Trust the manifest as long as the page on disk still has the size and mtime we wrote it with.
+        # Otherwise, the page was edited by hand (or never recorded), and we hash the page itself.
+        entry = self.__get_manifest_entry(base_path, page)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            # No open(), read() and close() of the old page
+            self.__syscalls_saved += 3
+            return entry['hash']
+
+        return self.__get_page_hash(base_path + "/" + page)
+
+    def __get_fsync_mode(self):
+        # 'file': fsync every page before it replaces the old one, and its directory after
+        # 'batch': stage all pages of a platform, fsync them one after the other, then replace them all,
+        #          and fsync every directory once
+        # 'none': leave it to the OS
+        fsync_mode = self.__config['fsync'] if 'fsync' in self.__config else 'batch'
+        if fsync_mode not in ['file', 'batch', 'none']:
+            raise ValueError(f"Invalid value '{fsync_mode}' for 'fsync'. Use 'file', 'batch' or 'none'.")
+
+        return fsync_mode
+
+    def __make_dirs(self, path):
+        with Platform.__directories_lock:
+            if path in self.__directories:
+                # Saves the os.path.exists() we would otherwise do for every page
+                self.__syscalls_saved += 1
+                return
+
+            os.makedirs(path, exist_ok=True)
+            self.__directories.add(path)
+
+    def __get_sweep_config(self):
+        sweep_config = self.__config['sweep'] if 'sweep' in self.__config else dict()
+
+        mode = sweep_config.get('mode', 'archive')
+        if mode not in ['archive', 'delete', 'off']:
+            raise ValueError(f"Invalid value '{mode}' for 'sweep.mode'. Use 'archive', 'delete' or 'off'.")
+
+        return {
+            'mode': mode,
+            'archive_directory': sweep_config.get('archive_directory', '.archive'),
+            'dry_run': sweep_config.get('dry_run', False) or Platform.sweep_dry_run,
+            'platforms': sweep_config.get('platforms')
+        }
+
+    def __sweep_pages(self, base_path, set_pages):
+        # Archives or deletes the pages this platform produced in an earlier run, but not in this one.
+        # Pages are only ever swept by the platform that owns them.
+        sweep_config = self.__get_sweep_config()
+        platform = type(self).__name__
+
+        if sweep_config['mode'] == 'off':
+            return
+        if sweep_config['platforms'] is not None and platform not in sweep_config['platforms']:
+            return
+
+        with Platform.__manifest_lock:
+            lst_orphans = sorted([page for page, entry in Platform.__manifests[base_path].items()
+                                  if entry.get('platform') == platform and page not in set_pages])
+
+        archive_path = os.path.join(base_path, sweep_config['archive_directory'], self._now.strftime("%Y-%m-%d"))
+        for page in lst_orphans:
+            f_path = base_path + "/" + page
+
+            if sweep_config['dry_run']:
+                self._logger.info(f"Page '{page}' is no longer produced. Would {sweep_config['mode']} it (dry run).")
+                continue
+
+            if os.path.exists(f_path):
+                if sweep_config['mode'] == 'archive':
+                    self._logger.info(f"Page '{page}' is no longer produced. Archiving it to '{archive_path}'.")
+                    os.makedirs(os.path.dirname(os.path.join(archive_path, page)), exist_ok=True)
+                    os.replace(f_path, os.path.join(archive_path, page))
+                else:
+                    self._logger.info(f"Page '{page}' is no longer produced. Deleting it.")
+                    os.remove(f_path)
+
+                self.__remove_empty_dirs(base_path, os.path.dirname(f_path))
+
+            with Platform.__manifest_lock:
+                del Platform.__manifests[base_path][page]
+
+            self.__pages_swept += 1
 
-        return new_content
+    def __remove_empty_dirs(self, base_path, path):
+        # Clean up the directories a sweep left empty, up to the output directory
+        with Platform.__directories_lock:
+            while os.path.abspath(path) != os.path.abspath(base_path) and not os.listdir(path):
+                os.rmdir(path)
+                self.__directories.discard(path)
+                path = os.path.dirname(path)
 
     def __export_to_markdown_files(self, inventory):
         base_path = self._get_output_dir()
@@ -225,61 +995,155 @@ class Platform:
         if not os.path.exists(base_path):
             raise FileExistsError(f"The output directory '{base_path}' does not exist. Exiting.")
 
-        for page in inventory:
-            self._logger.debug("Page: " + page)
+        fsync_mode = self.__get_fsync_mode()
+        lst_staged = list()
+
+        staging_path = self.__get_staging_path(base_path)
+        shutil.rmtree(staging_path, ignore_errors=True)
+        os.makedirs(staging_path)
+
+        self.__load_manifest(base_path)
+        try:
+            set_pages = set()
+            pages = iter(self.__get_pages(inventory))
+            while True:
+                # A platform that yields its pages does its work in between
+                with self._phase('transform'):
+                    page_content = next(pages, None)
+                if page_content is None:
+                    break
+
+                page, main_content = page_content
+                staged = self.__export_page(base_path, staging_path, page, main_content, fsync_mode)
+                if staged:
+                    lst_staged.append(staged)
+                set_pages.add(page)
+
+            # Only when all pages made it do we know which ones this platform doesn't produce anymore
+            self.__sweep_pages(base_path, set_pages)
+        finally:
+            # Whatever made it to a temporary file is complete, so we still put it in place
+            self.__commit_pages(lst_staged)
+            self.__save_manifest(base_path)
+
+    def __commit_pages(self, lst_staged):
+        if not lst_staged:
+            return
+
+        # The pages have been written back by the OS in the meantime, so their fsyncs have little left to do.
+        # Only then do the pages replace the old ones, so a crash never leaves a truncated page behind.
+        for f_tmp, f_path in lst_staged:
+            self.__fsync_path(f_tmp)
+
+        for f_tmp, f_path in lst_staged:
+            self.__replace_page(f_tmp, f_path)
+
+        # The renames are durable once their directories are; each of those is synced once for the whole batch
+        for path in sorted(set([os.path.dirname(f_path) for f_tmp, f_path in lst_staged])):
+            self.__fsync_path(path)
 
-            # Create path if it does not exist
-            path = "/".join(page.split('/')[:-1])
-            if not os.path.exists(base_path + "/" + path):
-                os.makedirs(base_path + "/" + path)
-
-            # Prep page content
-            new_content = self.__prep_page_content(inventory[page])
+    @staticmethod
+    def __replace_page(f_tmp, f_path):
+        try:
+            os.replace(f_tmp, f_path)
+        except FileNotFoundError:
+            # The directory of the page was removed while the page was staged, e.g. by the sweep of another platform
+            os.makedirs(os.path.dirname(f_path), exist_ok=True)
+            os.replace(f_tmp, f_path)
 
-            # Generate hash for new content
-            hash_new = hashlib.sha256(new_content.encode()).hexdigest()
+    @staticmethod
+    def __fsync_path(path):
+        # Syncs a file, or a directory, by its path
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def __export_page(self, base_path, staging_path, page, main_content, fsync_mode):
+        # Returns (temporary file, page file) when the page is staged to be put in place later
+        self._logger.debug("Page: " + page)
+
+        # Create path if it does not exist
+        f_path = base_path + "/" + page
+        self.__make_dirs(os.path.dirname(f_path))
+
+        # One stat tells us whether the page exists, and whether we can trust the manifest for it.
+        # This replaces two os.path.exists() calls for an unchanged page, three for a changed one.
+        try:
+            stat_old = os.stat(f_path)
+        except FileNotFoundError:
+            stat_old = None
+
+        hash_old = ""
+        if stat_old:
+            hash_old = self.__get_old_page_hash(base_path, page, stat_old)
+            self._logger.debug("Old hash: " + hash_old)
+
+        f_tmp = os.path.join(staging_path, quote(page, safe=''))
+        modified = datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%d")
+        if isinstance(main_content, list):
+            # The page is in memory already: hash it there, and only write it when it changed
+            chunks = list(self.__prep_page_content(main_content))
+            hash_new = self.__hash_page(chunks)
             self._logger.debug("New hash: " + hash_new)
 
-            f_path = base_path + "/" + page
-            hash_old = ""
-            if os.path.exists(f_path):
-                with open(f_path, 'r') as file:
-                    lst_old_content = list()
+            if stat_old and hash_old == hash_new:
+                self.__syscalls_saved += 1
+                self.__skip_page(base_path, page, hash_new, stat_old)
+                return None
 
-                    # Get all lines and collate them together
-                    for line in file:
-                        if line.find('modified: ') == -1:  # Ignore 'modified' line
-                            lst_old_content.append(line)
+            hash_new, stat_new = self.__write_temp_page(f_tmp, chunks, modified, fsync_mode)
+        else:
+            # A streamed page is only known once it has been written: hash it as it goes to a temporary file
+            hash_new, stat_new = self.__write_temp_page(f_tmp, self.__prep_page_content(main_content), modified,
+                                                        fsync_mode)
+            self._logger.debug("New hash: " + hash_new)
 
-                    old_content = "".join(lst_old_content)
+            if stat_old and hash_old == hash_new:
+                os.remove(f_tmp)
+                # The stat saved an os.path.exists(), the temporary file took an open(), write(), fstat(),
+                # close() and remove()
+                self.__syscalls_saved -= 4
+                self.__skip_page(base_path, page, hash_new, stat_old)
+                return None
 
-                    # Generate hash for existing content
-                    hash_old = hashlib.sha256(old_content.encode()).hexdigest()
+        # Nothing saved on a changed page: the stat saved two os.path.exists() calls, but the temporary file takes
+        # an fstat() and a rename() more than writing the page in place
+        self.__bytes_written += stat_new.st_size
 
-                    self._logger.debug("Old hash: " + hash_old)
-                    file.close()
+        if stat_old is None:
+            self._logger.info(f"The page '{page}' has been created.")
+        else:
+            self._logger.info(f"Page content for '{page}' has changed. Updating...")
 
-            if os.path.exists(f_path) is False or (not hash_old == hash_new):
-                if os.path.exists(f_path) is False:
-                    self._logger.info(f"The page '{page}' has been created.")
-                else:
-                    self._logger.info(f"Page content for '{page}' has changed. Updating...")
+        self.__set_manifest_entry(base_path, page, hash_new, stat_new)
+        self.__pages_changed += 1
+        self.__metrics.inc('pages_written')
 
-                with open(base_path + "/" + page, 'w') as md_file:
-                    # Last updated
-                    self._add_page_property('modified', datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%d"))
-                    new_content = self.__prep_page_content(inventory[page])
+        if fsync_mode == 'batch':
+            return f_tmp, f_path
 
-                    md_file.write(new_content)
+        self.__replace_page(f_tmp, f_path)
+        if fsync_mode == 'file':
+            self.__fsync_path(os.path.dirname(f_path))
 
-                    self.__pages_changed += 1
+        return None
 
-            else:
-                self._logger.info(f"No changes for page '{page}'")
+    def __skip_page(self, base_path, page, hash_new, stat_old):
+        self.__set_manifest_entry(base_path, page, hash_new, stat_old)
+        self.__metrics.inc('pages_skipped')
+        self._logger.info(f"No changes for page '{page}'")
 
     def _build_content(self):
         raise NotImplementedError("You must override _build_content in your child class")
 
     def inventorize(self):
-        inventory = self._build_content()
-        self.__export_to_markdown_files(inventory)
+        self.__metrics.start()
+        try:
+            inventory = self._build_content()
+            with self._phase('export'):
+                self.__export_to_markdown_files(inventory)
+        finally:
+            self.__metrics.stop()
+            self._close()
@@ -0,0 +1,179 @@
+import cProfile
+import datetime
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+
+class SamplingProfiler:
+    # Samples the stack of one thread, and of every thread started while sampling (the workers of the platform),
+    # at a fixed interval. Cheap enough to leave the platform's timing intact, unlike cProfile, which instruments
+    # every function call.
+    def __init__(self, thread_id, interval=0.005):
+        self.__thread_id = thread_id
+        self.__interval = interval
+        self.__stop = threading.Event()
+        self.__thread = None
+
+        # Threads that were already running, and aren't ours to sample
+        self.__ignored = set()
+
+        self.__frames = list()
+        self.__frame_index = dict()
+        # Per thread: {'name': ..., 'samples': [...], 'weights': [...]}
+        self.__threads = dict()
+
+    def start(self):
+        self.__ignored = set([thread.ident for thread in threading.enumerate() if thread.ident != self.__thread_id])
+        self.__get_thread(self.__thread_id)
+        self.__thread = threading.Thread(target=self.__run, name='sampler', daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        self.__thread.join()
+
+    def __get_frame_index(self, code):
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        if key not in self.__frame_index:
+            self.__frame_index[key] = len(self.__frames)
+            self.__frames.append({'name': code.co_name, 'file': code.co_filename, 'line': code.co_firstlineno})
+
+        return self.__frame_index[key]
+
+    def __get_thread(self, thread_id):
+        if thread_id not in self.__threads:
+            names = dict([(thread.ident, thread.name) for thread in threading.enumerate()])
+            self.__threads[thread_id] = {'name': names.get(thread_id, str(thread_id)), 'samples': list(),
+                                         'weights': list()}
+
+        return self.__threads[thread_id]
+
+    def __run(self):
+        self.__ignored.add(threading.get_ident())
+
+        last = time.perf_counter()
+        while not self.__stop.wait(self.__interval):
+            frames = sys._current_frames()
+            now = time.perf_counter()
+
+            for thread_id, frame in frames.items():
+                if thread_id in self.__ignored:
+                    continue
+
+                stack = list()
+                while frame is not None:
+                    stack.append(self.__get_frame_index(frame.f_code))
+                    frame = frame.f_back
+
+                # Outermost frame first; every sample weighs the time since the previous one
+                thread = self.__get_thread(thread_id)
+                thread['samples'].append(list(reversed(stack)))
+                thread['weights'].append(now - last)
+
+            last = now
+
+    def to_speedscope(self, name):
+        # https://www.speedscope.app/file-format-schema.json
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'inventoryst',
+            'shared': {'frames': self.__frames},
+            # The thread of the platform first, then its workers in the order they showed up
+            'profiles': [{
+                'type': 'sampled',
+                'name': name if thread_id == self.__thread_id else f"{name} ({thread['name']})",
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(thread['weights']),
+                'samples': thread['samples'],
+                'weights': thread['weights']
+            } for thread_id, thread in sorted(self.__threads.items(), key=lambda item: item[0] != self.__thread_id)]
+        }
+
+
+class Profiler:
+    # Profiles the run of one platform, on the current thread and the threads it starts, and dumps the results into
+    # 'directory':
+    #   - 'cprofile': <platform>-<time>.pstats, to be read with pstats, snakeviz, etc.
+    #   - 'sampling': <platform>-<time>.speedscope.json, to be opened on https://www.speedscope.app
+    #   - memory:     <platform>-<time>.tracemalloc.txt, the allocations that grew most during the run
+    modes = ['cprofile', 'sampling']
+
+    def __init__(self, platform, mode=None, memory=False, directory='profiles'):
+        if mode is not None and mode not in self.modes:
+            raise ValueError(f"Invalid profiler '{mode}'. Use {' or '.join(self.modes)}.")
+
+        self.__platform = platform
+        self.__mode = mode
+        self.__memory = memory
+        self.__directory = directory
+        self.__logger = logging.getLogger()
+
+        self.__profiler = None
+        self.__snapshot = None
+
+    def __get_path(self, suffix):
+        if not os.path.exists(self.__directory):
+            os.makedirs(self.__directory, exist_ok=True)
+
+        timestamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        return os.path.join(self.__directory, f'{self.__platform}-{timestamp}.{suffix}')
+
+    def __enter__(self):
+        if self.__memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+            self.__snapshot = tracemalloc.take_snapshot()
+
+        if self.__mode == 'cprofile':
+            self.__profiler = cProfile.Profile()
+            self.__profiler.enable()
+        elif self.__mode == 'sampling':
+            self.__profiler = SamplingProfiler(threading.get_ident())
+            self.__profiler.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Whether the run failed or not, the profile is written; a failing run is often what we are after
+        if self.__mode == 'cprofile':
+            self.__profiler.disable()
+            path = self.__get_path('pstats')
+            self.__profiler.dump_stats(path)
+
+            output = io.StringIO()
+            pstats.Stats(self.__profiler, stream=output).sort_stats('cumulative').print_stats(15)
+            self.__logger.debug(output.getvalue())
+            self.__logger.info(f"Profile of {self.__platform} written to '{path}'")
+
+        elif self.__mode == 'sampling':
+            self.__profiler.stop()
+            path = self.__get_path('speedscope.json')
+            with open(path, 'w') as f:
+                json.dump(self.__profiler.to_speedscope(self.__platform), f)
+            self.__logger.info(f"Profile of {self.__platform} written to '{path}'")
+
+        if self.__memory:
+            snapshot = tracemalloc.take_snapshot()
+            lst_stats = snapshot.compare_to(self.__snapshot, 'lineno')
+
+            path = self.__get_path('tracemalloc.txt')
+            with open(path, 'w') as f:
+                current, peak = tracemalloc.get_traced_memory()
+                f.write(f'Traced memory: current {current} bytes, peak {peak} bytes\n\n')
+                for stat in lst_stats[:50]:
+                    f.write(f'{stat}\n')
+
+            for stat in lst_stats[:5]:
+                self.__logger.info(f'Memory of {self.__platform}: {stat}')
+            self.__logger.info(f"Memory profile of {self.__platform} written to '{path}'")
+
+        return False
@@ -0,0 +1,183 @@
+import email.utils
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    # Allows `requests` per `per` seconds, with bursts of at most `burst` requests
+    def __init__(self, requests, per=1, burst=1):
+        self.__rate = requests / per
+        self.__capacity = max(1, burst)
+        self.__tokens = self.__capacity
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def reserve(self):
+        # Takes a token and returns the number of seconds to wait before it may be used.
+        # Tokens can go negative: callers queue up behind each other instead of racing for the next one.
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.__capacity, self.__tokens + (now - self.__updated) * self.__rate)
+            self.__updated = now
+
+            self.__tokens -= 1
+            if self.__tokens >= 0:
+                return 0
+
+            return -self.__tokens / self.__rate
+
+
+class RateGovernor:
+    # Decides how long to wait before a request, and whether (and when) to retry a rate limited one.
+    #
+    # limits: {host: {'requests': N, 'per': seconds, 'burst': B}}, or a list of those per host for APIs with limits
+    # over several windows (e.g. per minute and per hour); a request then waits for the strictest of them.
+    # Hosts without limits are not throttled up front, but the rate limit headers they send back are honored.
+    def __init__(self, limits=None, max_retries=5, backoff_base=1, backoff_max=60):
+        self.__buckets = dict()
+        if limits:
+            for host, host_limits in limits.items():
+                if isinstance(host_limits, dict):
+                    host_limits = [host_limits]
+
+                self.__buckets[host] = [TokenBucket(limit['requests'], limit.get('per', 1), limit.get('burst', 1))
+                                        for limit in host_limits]
+
+        self.__max_retries = max_retries
+        self.__backoff_base = backoff_base
+        self.__backoff_max = backoff_max
+
+        # Hosts that told us to back off, with the time.time() until which we should
+        self.__paused_until = dict()
+        self.__lock = threading.Lock()
+
+    def reserve(self, url):
+        # Seconds to wait before sending a request to url
+        host = urlparse(url).netloc
+
+        wait = 0
+        if host in self.__buckets:
+            wait = max([bucket.reserve() for bucket in self.__buckets[host]])
+
+        with self.__lock:
+            if host in self.__paused_until:
+                wait = max(wait, self.__paused_until[host] - time.time())
+
+        return max(0, wait)
+
+    def get_max_retries(self):
+        return self.__max_retries
+
+    def backoff(self, attempt):
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.__backoff_max, self.__backoff_base * (2 ** attempt)))
+
+    def __pause(self, host, until):
+        with self.__lock:
+            self.__paused_until[host] = max(until, self.__paused_until.get(host, 0))
+
+    @staticmethod
+    def __parse_retry_after(value):
+        # Retry-After is either a number of seconds, or an HTTP date
+        if value.isdigit():
+            return time.time() + int(value)
+
+        parsed = email.utils.parsedate_to_datetime(value)
+        return parsed.timestamp() if parsed else None
+
+    def retry_delay(self, url, status_code, headers, attempt):
+        # Returns the number of seconds to wait before retrying, or None if the response should be used as is
+        host = urlparse(url).netloc
+        now = time.time()
+
+        until = None
+        if 'Retry-After' in headers:
+            until = self.__parse_retry_after(headers['Retry-After'])
+        elif headers.get('X-RateLimit-Remaining') == '0' and 'X-RateLimit-Reset' in headers:
+            until = int(headers['X-RateLimit-Reset'])
+
+        # Even when this request made it, don't send the next one before the window resets
+        if until:
+            self.__pause(host, until)
+
+        rate_limited = status_code in [429, 503] or (status_code == 403 and until is not None)
+        if not rate_limited or attempt >= self.__max_retries:
+            return None
+
+        # Honor the server's instructions, but never wait less than our own backoff
+        delay = self.backoff(attempt)
+        if until:
+            delay = max(delay, until - now)
+
+        return delay
+
+
+class RateBudget:
+    # A rate limit shared by all workers of a platform, as the API reports it: per resource, the requests
+    # `remaining` until `reset` (time.time()). Once remaining drops below twice the reserve, requests are spread
+    # evenly over what is left of the window; requests that would dip into the reserve are held until the reset.
+    # The reserve is left for other users of the same credentials.
+    def __init__(self, reserve=0):
+        self.__reserve = reserve
+        self.__resources = dict()
+        self.__lock = threading.Lock()
+
+    def update(self, resource, remaining, reset):
+        with self.__lock:
+            if resource in self.__resources:
+                current = self.__resources[resource]
+
+                # Responses come back out of order; within a window, the lowest remaining is the most recent
+                if reset == current['reset']:
+                    current['remaining'] = min(current['remaining'], remaining)
+                    return
+                elif reset < current['reset']:
+                    return
+
+            self.__resources[resource] = {'remaining': remaining, 'reset': reset, 'next': 0}
+
+    def update_from_headers(self, headers, resource=None):
+        # X-RateLimit-* headers, as Github (and others) send them with every response
+        if 'X-RateLimit-Remaining' not in headers or 'X-RateLimit-Reset' not in headers:
+            return
+
+        self.update(headers.get('X-RateLimit-Resource', resource),
+                    int(headers['X-RateLimit-Remaining']), int(headers['X-RateLimit-Reset']))
+
+    def reserve(self, resource, cost=1):
+        # Takes `cost` requests from the budget, and returns the number of seconds to wait before sending them
+        with self.__lock:
+            return self.__get_wait(resource, cost, take=True)
+
+    def wait_for(self, resource, cost=1):
+        # The number of seconds reserve() would wait for `cost` requests, without taking them from the budget
+        with self.__lock:
+            return self.__get_wait(resource, cost, take=False)
+
+    def __get_wait(self, resource, cost, take):
+        if resource not in self.__resources:
+            return 0
+
+        budget = self.__resources[resource]
+        now = time.time()
+        if budget['reset'] <= now:
+            # A new window, of which we don't know the budget until the next response tells
+            return 0
+
+        # What is left above the reserve once these requests have been sent
+        spare = budget['remaining'] - cost - self.__reserve
+        if take:
+            budget['remaining'] -= cost
+
+        if spare < 0:
+            return budget['reset'] - now + 1
+        elif spare >= self.__reserve:
+            return 0
+
+        # Queue up behind the workers that are already waiting
+        slot = max(now, budget['next'])
+        if take:
+            budget['next'] = slot + cost * (budget['reset'] - now) / (spare + cost)
+        return slot - now
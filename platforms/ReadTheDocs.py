@@ -12,12 +12,8 @@ class ReadTheDocs(Platform):
 
         self.__headers = [['Authorization', 'Token ' + api_key]]
 
-    def __get_build_details(self, slug):
-        url_builds = f"{self.__api_url}/projects/{slug}/builds/"
-
-        dict_builds = self._get_json_from_url(url=url_builds, headers=self.__headers)
-
-        if dict_builds:
+    def __get_build_details(self, dict_builds):
+        if dict_builds and dict_builds['results']:
             # RtD returns builds in reverse order of build dates. So last build comes first!
             last_build = dict_builds['results'][0]
 
@@ -33,34 +29,42 @@ class ReadTheDocs(Platform):
         dict_projects["meta"] = dict()
         dict_projects["content"] = list()
 
-        # Get the projects
-        url_projects = f'{self.__api_url}/projects/?limit=30'
-        projects = self._get_json_from_url(url=url_projects, headers=self.__headers)
-
-        dict_projects["meta"]["project_count"] = projects["count"]
+        # Get the projects, page by page
+        url_projects = f'{self.__api_url}/projects/?limit=100'
+        pages = self._paginate_pages(url_projects, headers=self.__headers, items='results', scheme='next')
 
+        project_count = 0
         field_filter = ['name', 'created', 'modified']
-        for project in projects["results"]:
-            self._logger.debug(f'Project: {project['name']}')
-            dict_project = self._filter_fields(project, field_filter)
-
-            # Get build details
-            dict_last_build = self.__get_build_details(project['slug'])
-            if dict_last_build:
-                build_status = "success" if dict_last_build['success'] is True else "failed"
-                dict_project['last_build_status'] = build_status
-                dict_project['last_build'] = dict_last_build["date_finished"]
-            else:
-                dict_project['last_build_status'] = None
-                dict_project['last_build'] = None
+        for lst_projects in pages:
+            project_count += len(lst_projects)
+
+            # Get the last build of all projects on this page concurrently
+            urls_builds = [f"{self.__api_url}/projects/{project['slug']}/builds/?limit=1" for project in lst_projects]
+            lst_builds = self._get_json_from_urls(urls_builds, headers=self.__headers)
+
+            for project, dict_builds in zip(lst_projects, lst_builds):
+                self._logger.debug(f'Project: {project['name']}')
+                dict_project = self._filter_fields(project, field_filter)
+
+                # Get build details
+                dict_last_build = self.__get_build_details(dict_builds)
+                if dict_last_build:
+                    build_status = "success" if dict_last_build['success'] is True else "failed"
+                    dict_project['last_build_status'] = build_status
+                    dict_project['last_build'] = dict_last_build["date_finished"]
+                else:
+                    dict_project['last_build_status'] = None
+                    dict_project['last_build'] = None
+
+                dict_project['repository'] = project['repository']['url']
+                dict_project['documentation'] = project['urls']['documentation']
+                dict_project['home'] = project['urls']['home']
 
-            dict_project['repository'] = project['repository']['url']
-            dict_project['documentation'] = project['urls']['documentation']
-            dict_project['home'] = project['urls']['home']
+                dict_project['users'] = [user['username'] for user in project['users']]
 
-            dict_project['users'] = [user['username'] for user in project['users']]
+                dict_projects["content"].append(dict_project)
 
-            dict_projects["content"].append(dict_project)
+        dict_projects["meta"]["project_count"] = project_count
 
         return dict_projects
 
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class ResponseCache:
+    # Disk backed cache for HTTP responses, stored in SQLite.
+    # Only responses carrying an ETag or Last-Modified header are stored. These validators are
+    # sent back as conditional headers on the next request; a '304 Not Modified' is then served from the cache.
+
+    # Headers we don't replay. The body is stored decoded, so the encoding headers don't apply anymore.
+    __skip_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive']
+
+    def __init__(self, directory, ttl_days=7, max_size_mb=512):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.__ttl = ttl_days * 24 * 3600
+        self.__max_size = max_size_mb * 1024 * 1024
+
+        # Connections are used from worker threads (prefetching), so guard them with a lock
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(os.path.join(directory, 'responses.sqlite'), timeout=30, check_same_thread=False)
+
+        with self.__lock:
+            # WAL allows platforms running in parallel to read while another one writes
+            self.__db.execute('PRAGMA journal_mode=WAL')
+            self.__db.execute('CREATE TABLE IF NOT EXISTS responses ('
+                              'key TEXT PRIMARY KEY, '
+                              'status INTEGER, '
+                              'etag TEXT, '
+                              'last_modified TEXT, '
+                              'headers TEXT, '
+                              'body BLOB, '
+                              'size INTEGER, '
+                              'stored_at REAL, '
+                              'accessed_at REAL)')
+            self.__db.execute('CREATE INDEX IF NOT EXISTS idx_accessed_at ON responses (accessed_at)')
+            self.__db.commit()
+
+    @staticmethod
+    def key(method, url, scope=''):
+        # The scope separates the same url requested with different credentials.
+        # It is hashed together with the url, so no credentials end up on disk.
+        return hashlib.sha256(f'{method.upper()} {url} {scope}'.encode()).hexdigest()
+
+    def get(self, key):
+        with self.__lock:
+            row = self.__db.execute('SELECT status, etag, last_modified, headers, body, stored_at '
+                                    'FROM responses WHERE key = ?', (key,)).fetchone()
+
+        if row is None:
+            return None
+
+        status, etag, last_modified, headers, body, stored_at = row
+
+        # Expired entries are not worth validating anymore
+        if stored_at + self.__ttl < time.time():
+            self.delete(key)
+            return None
+
+        return {
+            'status': status,
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': json.loads(headers),
+            'body': zlib.decompress(body)
+        }
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = dict()
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        return headers
+
+    def put(self, key, status, headers, body):
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+
+        # Without validators, we can never revalidate; no use in storing it
+        if not etag and not last_modified:
+            return
+
+        dict_headers = {k: v for k, v in headers.items() if k.lower() not in self.__skip_headers}
+        compressed = zlib.compress(body)
+        now = time.time()
+
+        with self.__lock:
+            self.__db.execute('INSERT OR REPLACE INTO responses '
+                              '(key, status, etag, last_modified, headers, body, size, stored_at, accessed_at) '
+                              'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                              (key, status, etag, last_modified, json.dumps(dict_headers), compressed, len(compressed),
+                               now, now))
+            self.__db.commit()
+
+    def touch(self, key):
+        # A revalidated entry is fresh again
+        now = time.time()
+        with self.__lock:
+            self.__db.execute('UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?', (now, now, key))
+            self.__db.commit()
+
+    def delete(self, key):
+        with self.__lock:
+            self.__db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self.__db.commit()
+
+    def to_response(self, entry, url):
+        # Rebuild a requests.Response out of a cache entry
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body']
+        response.url = url
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+
+        return response
+
+    def evict(self):
+        # Drop expired entries, then the least recently used ones until we are below the maximum size
+        with self.__lock:
+            self.__db.execute('DELETE FROM responses WHERE stored_at < ?', (time.time() - self.__ttl,))
+
+            total_size = self.__db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total_size > self.__max_size:
+                rows = self.__db.execute('SELECT key, size FROM responses ORDER BY accessed_at ASC').fetchall()
+
+                lst_keys = list()
+                for key, size in rows:
+                    if total_size <= self.__max_size:
+                        break
+
+                    lst_keys.append((key,))
+                    total_size -= size
+
+                self.__db.executemany('DELETE FROM responses WHERE key = ?', lst_keys)
+
+            self.__db.commit()
+
+    def close(self):
+        with self.__lock:
+            self.__db.close()
@@ -0,0 +1,122 @@
+import datetime
+import random
+from dateutil.relativedelta import relativedelta
+
+
+class CronExpression:
+    # Five field cron expression: minute, hour, day of month, month and day of week.
+    # Fields take '*', numbers, ranges ('1-5'), steps ('*/15', '0-30/10') and lists of those ('0,30').
+    __ranges = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid cron expression '{expression}': expected 5 fields")
+
+        try:
+            parsed = [self.__parse_field(field, low, high) for field, (low, high) in zip(fields, self.__ranges)]
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression '{expression}': {e}") from e
+
+        self.__minutes, self.__hours, self.__days, self.__months, self.__weekdays = parsed
+
+        # Both 0 and 7 are Sunday
+        if 7 in self.__weekdays:
+            self.__weekdays = (self.__weekdays - {7}) | {0}
+
+        # As in cron: when both day fields are restricted, a day matching either one will do. A field starting with
+        # '*' (like '*/2') doesn't count as restricted.
+        self.__days_restricted = not fields[2].startswith('*')
+        self.__weekdays_restricted = not fields[4].startswith('*')
+
+        self.__expression = expression
+
+    @staticmethod
+    def __parse_field(field, low, high):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step = part.split('/')
+                step = int(step)
+
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = [int(value) for value in part.split('-')]
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"'{field}' is out of range {low}-{high}")
+
+            values.update(range(start, end + 1, step))
+
+        return values
+
+    def __day_matches(self, moment):
+        day_matches = moment.day in self.__days
+        # datetime counts from Monday = 0, cron from Sunday = 0
+        weekday_matches = (moment.weekday() + 1) % 7 in self.__weekdays
+
+        if self.__days_restricted and self.__weekdays_restricted:
+            return day_matches or weekday_matches
+
+        return day_matches and weekday_matches
+
+    def next(self, after):
+        # The first matching minute after the (naive, local) datetime 'after'
+        moment = after.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = moment + relativedelta(years=5)
+
+        while moment < limit:
+            if moment.month not in self.__months:
+                moment = moment.replace(day=1, hour=0, minute=0) + relativedelta(months=1)
+            elif not self.__day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif moment.hour not in self.__hours:
+                moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+            elif moment.minute not in self.__minutes:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return moment
+
+        raise ValueError(f"Cron expression '{self.__expression}' never matches")
+
+
+class Schedule:
+    # When to run each platform in daemon mode.
+    #
+    # schedule_config: {'interval': seconds, 'jitter': seconds, 'platforms': {platform: {...}}}
+    # Every platform runs every 'interval' seconds, unless it has an 'interval' or 'cron' of its own.
+    # A random delay of up to 'jitter' seconds is added to every run, so platforms don't all hit at once.
+    def __init__(self, schedule_config, platforms):
+        default_interval = schedule_config.get('interval', 3600)
+        self.__default_interval = default_interval
+        default_jitter = schedule_config.get('jitter', 0)
+        platform_config = schedule_config.get('platforms') or dict()
+
+        self.__entries = dict()
+        for platform in platforms:
+            entry = platform_config.get(platform) or dict()
+
+            self.__entries[platform] = {
+                'interval': entry.get('interval', default_interval),
+                'cron': CronExpression(entry['cron']) if 'cron' in entry else None,
+                'jitter': entry.get('jitter', default_jitter)
+            }
+
+    def get_default_interval(self):
+        return self.__default_interval
+
+    def next_run(self, platform, after):
+        # The next run of a platform, as a timestamp, for a run that started at timestamp 'after'
+        entry = self.__entries[platform]
+
+        if entry['cron']:
+            next_run = entry['cron'].next(datetime.datetime.fromtimestamp(after)).timestamp()
+        else:
+            next_run = after + entry['interval']
+
+        return next_run + random.uniform(0, entry['jitter'])
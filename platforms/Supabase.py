@@ -3,10 +3,13 @@ from nacl.pwhash import kdf_scryptsalsa208sha256
 from platforms import Platform
 from pprint import pp
 
-# The rate limit for the Management API is 60 requests per one minute per user.
-# https://supabase.com/docs/reference/api/start
-
 class Supabase(Platform):
+  # The rate limit for the Management API is 60 requests per one minute per user.
+  # https://supabase.com/docs/reference/api/start
+  _rate_limits = {
+    'api.supabase.com': {'requests': 60, 'per': 60}
+  }
+
   def __init__(self):
     super().__init__()
 
@@ -1,21 +1,30 @@
 from .Platform import Platform
 import base64
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from dateutil import parser as date_parser, relativedelta
 import datetime
 import pprint
-import time
 
 # https://marketplace.zoom.us/develop/apps/
 # https://developers.zoom.us/docs/api/
 
 
 class Zoom(Platform):
+    # Recordings are a 'Medium' API; the lowest plan allows 20 of those per second
+    # https://developers.zoom.us/docs/api/rest/rate-limits/
+    _rate_limits = {
+        'api.zoom.us': {'requests': 10, 'per': 1}
+    }
+
     def __init__(self):
         super().__init__()
 
         self.__config = self.load_config('zoom')
 
+        # The access token is new every run; cached responses belong to the app's credentials
+        self._set_credential_identity(self.__config['account_id'], self.__config['client_id'],
+                                      self.__config['client_secret'])
         self.access_token = self.__request_access_token()
 
         self.__headers = [
@@ -40,7 +49,8 @@ class Zoom(Platform):
         dict_post_data['grant_type'] = 'account_credentials'
         dict_post_data['account_id'] = account_id
 
-        response = requests.post(zoom_api, dict_post_data, headers=dict_headers)
+        response = requests.post(self._rewrite_url(zoom_api), dict_post_data, headers=dict_headers)
+        self._record('POST', zoom_api, dict_post_data, response)
 
         return response.json()['access_token']
 
@@ -75,7 +85,33 @@ class Zoom(Platform):
 
         return dict_month_range
 
-    def __get_recording_stats(self, user_id, start_date):
+    def __get_recordings_for_month(self, user_id, start_date, end_date):
+        # Returns None when (a page of) the month could not be fetched; a month with no recordings is not a failure
+        api_url = f'https://api.zoom.us/v2/users/{user_id}/recordings?from={start_date}&to={end_date}&page_size=300'
+
+        dict_month = {
+            'total_recordings': 0,
+            'total_recordings_size': 0,
+            'total_recordings_length': 0
+        }
+
+        # A busy month can span multiple pages
+        recordings = self._paginate(api_url, headers=self.__headers, items='meetings', scheme='token', prefetch=False,
+                                    strict=True)
+        try:
+            for recording in recordings:
+                dict_month['total_recordings'] += 1
+                dict_month['total_recordings_length'] += recording['duration']
+
+                for file in recording['recording_files']:
+                    dict_month['total_recordings_size'] += file['file_size']
+        except (RuntimeError, requests.RequestException) as e:
+            self._logger.warning(f"Recordings of user '{user_id}' from {start_date} could not be fetched: {e}")
+            return None
+
+        return dict_month
+
+    def __get_recording_stats(self, dict_user_created):
         # As of my current knowledge, there is no way to know if a user even has recordings or not.
         # We can only request recordings per user, even more limited by the fact that we can only
         # request recordings over a period of maximum a month.
@@ -83,45 +119,77 @@ class Zoom(Platform):
         # Therefore, this is a very expensive operation. We have been able to tame it a bit by
         # using the creation_date of a user as the start date for searching, as a user can only create recordings
         # when they themselves have been created.
+        # Closed months don't change anymore, so their totals are kept between runs. Per user, we only fetch
+        # the months after the stored watermark, the current month, and a rolling window of recent months to
+        # re-verify (recordings can still be deleted afterwards).
+        # To keep it manageable, all (user, month) pairs are fetched concurrently on a pool of workers,
+        # within the rate limits of the Zoom API.
+        dict_state = self._load_state('zoom_recordings')
+
+        reverify_months = self.__config['recording_reverify_months'] if 'recording_reverify_months' in self.__config else 1
 
         # Recordings can only be fetched per month, so we need to query multiple times
-        start_date = date_parser.parse(start_date).date()
         end_date = datetime.date.today()
+        current_month = str(end_date.replace(day=1))
+        reverify_from = str(end_date.replace(day=1) - relativedelta.relativedelta(months=reverify_months))
 
-        range_months = self.__month_range(start_date, end_date)
+        lst_jobs = list()
+        for user_id, created_at in dict_user_created.items():
+            start_date = date_parser.parse(created_at).date()
 
-        total_recording_number = 0
-        total_recording_size = 0
-        total_recording_length = 0
+            if user_id not in dict_state:
+                dict_state[user_id] = {'watermark': None, 'months': dict()}
+            dict_user_state = dict_state[user_id]
 
-        for start_date in range_months:
-            end_date = range_months[start_date]
-            api_url = f'https://api.zoom.us/v2/users/{user_id}/recordings?from={start_date}&to={end_date}?page_size=300'
+            range_months = self.__month_range(start_date, end_date)
+            for month_start, month_end in range_months.items():
+                if (month_start == current_month or
+                        month_start >= reverify_from or
+                        month_start not in dict_user_state['months'] or
+                        dict_user_state['watermark'] is None or
+                        month_start > dict_user_state['watermark']):
+                    lst_jobs.append((user_id, month_start, month_end))
 
-            recordings = self._get_json_from_url(api_url, self.__headers)
-            if recordings and recordings['total_records'] > 0:
-                # pprint.pprint(recordings)
+        workers = self.__config['recording_workers'] if 'recording_workers' in self.__config else 8
+        self._logger.info(f"Scanning {len(lst_jobs)} months of recordings for {len(dict_user_created)} users "
+                          f"with {workers} workers")
 
-                total_recording_number += recordings['total_records']
+        failed_count = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            months = executor.map(lambda job: self.__get_recordings_for_month(*job), lst_jobs)
 
-                for recording in recordings['meetings']:
-                    total_recording_length += recording['duration']
+            for (user_id, month_start, month_end), dict_month in zip(lst_jobs, months):
+                # A failed month keeps what it had, if anything
+                if dict_month is None:
+                    failed_count += 1
+                    continue
 
-                    for file in recording['recording_files']:
-                        total_recording_size += file['file_size']
+                dict_state[user_id]['months'][month_start] = dict_month
 
-            # We are getting errors of 'Remote end closed connection without response'
-            # As this might have to do with us overheating the system, we are building in sleep time
-            # This is a shot in the dark, though...
-            time.sleep(1)
+        if failed_count:
+            self._logger.warning(f"Recordings of {failed_count} of {len(lst_jobs)} months could not be fetched. "
+                                 f"Recording totals are incomplete until they are fetched on a next run.")
 
-        dict_recording_stats = {
-            'total_recordings': total_recording_number,
-            'total_recordings_size': total_recording_size,
-            'total_recordings_length': total_recording_length
-        }
+        # The watermark is the last closed month up to which every month has been fetched successfully.
+        # A month that failed holds it back, so it is fetched again on the next run.
+        for user_id, created_at in dict_user_created.items():
+            dict_months = dict_state[user_id]['months']
 
-        return dict_recording_stats
+            watermark = None
+            for month_start in self.__month_range(date_parser.parse(created_at).date(), end_date):
+                if month_start >= current_month or month_start not in dict_months:
+                    break
+                watermark = month_start
+
+            dict_state[user_id]['watermark'] = watermark
+
+        # Forget users that are gone. On development, we only scan a few users, so keep the others.
+        if self._stage != 'dev':
+            dict_state = {user_id: dict_state[user_id] for user_id in dict_user_created}
+
+        self._save_state('zoom_recordings', dict_state)
+
+        return {user_id: dict_state[user_id]['months'] for user_id in dict_user_created}
 
     def __enumerate_rooms(self):
         dict_rooms = dict()
@@ -152,21 +220,6 @@ class Zoom(Platform):
         url_usage = 'https://api.zoom.us/v2/accounts/me/plans/usage?page_size=100'
         dict_plan_usage = self._get_json_from_url(url_usage, self.__headers)
 
-        url_users = 'https://api.zoom.us/v2/users?page_size=100'
-        users = self._get_json_from_url(url_users, self.__headers)
-
-        # Users
-        dict_users["meta"]["user_count"] = users['total_records']
-
-        nr_of_owners = len([user for user in users['users'] if user['role_id'] == '0'])
-        dict_users["meta"]["owner_count"] = nr_of_owners
-
-        nr_of_admins = len([user for user in users['users'] if user['role_id'] == '1'])
-        dict_users["meta"]["admin_count"] = nr_of_admins
-
-        nr_of_members = len([user for user in users['users'] if user['role_id'] == '2'])
-        dict_users["meta"]["member_count"] = nr_of_members
-
         # Licences
         dict_users["meta"]["licenses_available"] = dict_plan_usage['plan_base']['hosts']
         dict_users["meta"]["licenses_used"] = dict_plan_usage['plan_base']['usage']
@@ -175,8 +228,22 @@ class Zoom(Platform):
         dict_users["meta"]["recording_storage"] = dict_plan_usage['plan_recording']['free_storage']
         dict_users["meta"]["recording_storage_used"] = dict_plan_usage['plan_recording']['free_storage_usage']
 
+        # Users, streamed page by page
+        url_users = 'https://api.zoom.us/v2/users?page_size=300'
+        users = self._paginate(url_users, headers=self.__headers, items='users', scheme='token')
+
+        dict_users["meta"]["user_count"] = 0
+        dict_users["meta"]["owner_count"] = 0
+        dict_users["meta"]["admin_count"] = 0
+        dict_users["meta"]["member_count"] = 0
+
         rec_fetch_limit = 0
-        for user in users['users']:
+        dict_recording_users = dict()
+        for user in users:
+            dict_users["meta"]["user_count"] += 1
+            dict_users["meta"]["owner_count"] += 1 if user['role_id'] == '0' else 0
+            dict_users["meta"]["admin_count"] += 1 if user['role_id'] == '1' else 0
+            dict_users["meta"]["member_count"] += 1 if user['role_id'] == '2' else 0
 
             url_user = f'https://api.zoom.us/v2/users/{user['id']}'
             dict_additional_user_data = self._get_json_from_url(url_user, self.__headers)
@@ -189,44 +256,64 @@ class Zoom(Platform):
             tmp_user['full_name'] = user['first_name'] + ' ' + user['last_name']
             tmp_user['personal_meeting_url'] = dict_additional_user_data['personal_meeting_url']
 
-            # Recordings statistics
+            # Recordings statistics are collected for all users at once, below.
             # On development, we only try to fetch recordings for a few users,
             # as this is an expensive (time-wise) operation
             if rec_fetch_limit < 3:
-                recordings = self.__get_recording_stats(user['id'], user['user_created_at'])
-                tmp_user['recording_stats'] = recordings
+                dict_recording_users[user['id']] = user['user_created_at']
                 if self._stage == 'dev':
                     rec_fetch_limit += 1
 
             dict_users['content'].append(tmp_user)
 
+        # Recordings statistics, per month
+        dict_recording_months = self.__get_recording_stats(dict_recording_users)
+        for tmp_user in dict_users['content']:
+            if tmp_user['id'] in dict_recording_months:
+                tmp_user['recording_months'] = dict_recording_months[tmp_user['id']]
+
         return dict_users
 
-    def __users_to_markdown(self, inventory):
+    def __sum_recording_months(self, dict_months):
+        dict_recording_stats = {
+            'total_recordings': 0,
+            'total_recordings_size': 0,
+            'total_recordings_length': 0
+        }
 
-        lst_content = list()
+        for dict_month in dict_months.values():
+            for key in dict_recording_stats:
+                dict_recording_stats[key] += dict_month[key]
 
-        lst_content.append(">[!info] General information")
+        return dict_recording_stats
+
+    def __users_to_markdown(self, inventory):
+        # The lines of the page are produced while it is written, so the page is never held in memory as a whole
+        file = "zoom.md"
+        return {file: self.__user_lines(inventory)}
+
+    def __user_lines(self, inventory):
+        yield ">[!info] General information"
 
         # Users
-        lst_content.append(self._item(self._link('https://us02web.zoom.us/account/user#', 'Users total'),
-                                      inventory["meta"]["user_count"]))
-        lst_content.append(self._item('Owners', inventory["meta"]["owner_count"]))
-        lst_content.append(self._item('Admins', inventory["meta"]["admin_count"]))
-        lst_content.append(self._item('Members', inventory["meta"]["member_count"]))
-        lst_content.append('>\n>---')
+        yield self._item(self._link('https://us02web.zoom.us/account/user#', 'Users total'),
+                         inventory["meta"]["user_count"])
+        yield self._item('Owners', inventory["meta"]["owner_count"])
+        yield self._item('Admins', inventory["meta"]["admin_count"])
+        yield self._item('Members', inventory["meta"]["member_count"])
+        yield '>\n>---'
 
         # Licenses
-        lst_content.append(self._item(self._link('https://admin.zoom.us/billing', 'Licenses'),
-                                      inventory["meta"]["licenses_available"]))
-        lst_content.append(self._item('Licenses uesd', inventory["meta"]["licenses_used"]))
-        lst_content.append('>\n>---')
+        yield self._item(self._link('https://admin.zoom.us/billing', 'Licenses'),
+                         inventory["meta"]["licenses_available"])
+        yield self._item('Licenses uesd', inventory["meta"]["licenses_used"])
+        yield '>\n>---'
 
         # Recordings
-        lst_content.append(self._item(self._link('https://admin.zoom.us/recording/management', 'Recording storage'),
-                                      inventory["meta"]["recording_storage"]))
-        lst_content.append(self._item('Recording storage used', inventory["meta"]["recording_storage_used"]))
-        lst_content.append("")
+        yield self._item(self._link('https://admin.zoom.us/recording/management', 'Recording storage'),
+                         inventory["meta"]["recording_storage"])
+        yield self._item('Recording storage used', inventory["meta"]["recording_storage_used"])
+        yield ""
 
         # All the users
         lst_users = sorted(inventory["content"], key=lambda item: item["full_name"])
@@ -242,56 +329,55 @@ class Zoom(Platform):
             else:
                 display_name = dict_user['full_name'] + " (" + dict_user['display_name'] + ")"
 
-            lst_content.append(f'{avatar}{self._item('Name', display_name)}')
-            lst_content.append(self._item('Created', self._format_date(dict_user['user_created_at'])))
+            yield f'{avatar}{self._item('Name', display_name)}'
+            yield self._item('Created', self._format_date(dict_user['user_created_at']))
 
-            lst_content.append(self._item('PMI', dict_user['pmi']))
-            lst_content.append(self._item('Personal meeting URL', dict_user['personal_meeting_url']))
-            lst_content.append(self._item('Email', dict_user['email']))
+            yield self._item('PMI', dict_user['pmi'])
+            yield self._item('Personal meeting URL', dict_user['personal_meeting_url'])
+            yield self._item('Email', dict_user['email'])
 
-            lst_content.append(self._item('Last login', self._format_date(dict_user['last_login_time'])))
+            yield self._item('Last login', self._format_date(dict_user['last_login_time']))
 
             if 'last_client_version' in dict_user:
-                lst_content.append(self._item('Last client', dict_user['last_client_version']))
+                yield self._item('Last client', dict_user['last_client_version'])
 
             if dict_user['type'] == 2:
                 lic_type = "Licensed"
             else:
                 lic_type = "Basic"
-            lst_content.append(self._item('Type', lic_type))
+            yield self._item('Type', lic_type)
 
             if dict_user['role_id'] == '1':
                 role = 'Admin'
             else:
                 role = 'Member'
-            lst_content.append(self._item('Role', role))
+            yield self._item('Role', role)
 
             # Recordings
-            if 'recording_stats' in dict_user:
-                if dict_user['recording_stats']['total_recordings'] > 0:
-                    raw_rec_length = dict_user['recording_stats']['total_recordings_length']
+            if 'recording_months' in dict_user:
+                dict_recording_stats = self.__sum_recording_months(dict_user['recording_months'])
+
+                if dict_recording_stats['total_recordings'] > 0:
+                    raw_rec_length = dict_recording_stats['total_recordings_length']
                     if raw_rec_length < 60:
                         recording_length = str(raw_rec_length) + ' minute(s)'
                     else:
-                        recording_length = (str(round(dict_user['recording_stats']['total_recordings_length'] / 60, 2))
+                        recording_length = (str(round(dict_recording_stats['total_recordings_length'] / 60, 2))
                                             + " hours")
 
-                    recording_size = self._format_bytes(dict_user['recording_stats']['total_recordings_size'])
+                    recording_size = self._format_bytes(dict_recording_stats['total_recordings_size'])
 
                     # If size of recordings is greater than X GB, we make it a warning
                     recording_warning_size = self.__config['recording_warning_size']
                     recording_size_display = recording_size
-                    if int(dict_user['recording_stats']['total_recordings_size']) > (1024 * 1024 * 1024 * recording_warning_size):
+                    if int(dict_recording_stats['total_recordings_size']) > (1024 * 1024 * 1024 * recording_warning_size):
                         recording_size_display = self._highlight(recording_size, 'white', 'red')
 
-                    lst_content.append(self._item('Recordings', str(dict_user['recording_stats']['total_recordings']) +
-                                       " | " + recording_length +
-                                       " | " + recording_size_display))
+                    yield self._item('Recordings', str(dict_recording_stats['total_recordings']) +
+                                     " | " + recording_length +
+                                     " | " + recording_size_display)
 
-            lst_content.append("")
-
-        file = "zoom.md"
-        return {file: lst_content}
+            yield ""
 
     def _build_content(self):
         md_main = dict()
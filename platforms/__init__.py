@@ -1,14 +1,48 @@
+import importlib
+
+from .Config import Config
+from .Metrics import Metrics
 from .Platform import Platform
-from .DNS import DNS
-from .Netlify import Netlify
-from .ReadTheDocs import ReadTheDocs
-from .MySQL import MySQL
-from .Zoom import Zoom
-from .Discourse import Discourse
-from .Notion import Notion
-from .DockerHub import DockerHub
-from .Github import Github
-from .Zulip import Zulip
-from .Supabase import Supabase
-from .Cloudflare import Cloudflare
-from .Grafana import Grafana
\ No newline at end of file
+from .Profiler import Profiler
+from .Schedule import Schedule
+
+# All platforms, each in a module of the same name. They are imported on first use only:
+# between them, they pull in PyGithub, cloudflare, mysql-connector, zulip and more.
+platform_names = [
+    'Cloudflare',
+    'Discourse',
+    'DNS',
+    'DockerHub',
+    'Github',
+    'Grafana',
+    'MySQL',
+    'Netlify',
+    'Notion',
+    'ReadTheDocs',
+    'Supabase',
+    'Zoom',
+    'Zulip'
+]
+
+
+def get_platform(name):
+    # Returns the class of a platform, importing its module when needed
+    if name not in platform_names:
+        raise ValueError(f"Unknown platform '{name}'")
+
+    module = importlib.import_module(f'.{name}', __name__)
+    platform = getattr(module, name)
+
+    # Importing the module set it as attribute of this package. Point it to the class instead,
+    # as 'from platforms import Github' always did.
+    globals()[name] = platform
+
+    return platform
+
+
+def __getattr__(name):
+    # Keeps 'platforms.Github' and 'from platforms import Github' working, without importing everything up front
+    if name in platform_names:
+        return get_platform(name)
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -0,0 +1,45 @@
+import datetime
+import unittest
+
+from platforms.Schedule import CronExpression
+
+
+class TestCronExpression(unittest.TestCase):
+    def matches(self, expression, start, days):
+        # The days (as dates) on which the expression fires, over the given number of days from 'start'
+        cron = CronExpression(expression)
+        moment = start - datetime.timedelta(minutes=1)
+        limit = start + datetime.timedelta(days=days)
+
+        lst_days = list()
+        while True:
+            moment = cron.next(moment)
+            if moment >= limit:
+                return lst_days
+            lst_days.append(moment.date())
+
+    def test_step_on_day_of_month_is_unrestricted(self):
+        # '*/2' counts as '*', so both day fields must match: odd days that are a Monday
+        lst_days = self.matches('0 3 */2 * 1', datetime.datetime(2026, 1, 1), 366)
+
+        self.assertTrue(lst_days)
+        for day in lst_days:
+            self.assertEqual(day.weekday(), 0)
+            self.assertEqual(day.day % 2, 1)
+
+    def test_restricted_day_fields_match_either(self):
+        # The 1st and 15th of every month, and every Monday
+        lst_days = self.matches('0 3 1,15 * 1', datetime.datetime(2026, 1, 1), 366)
+
+        self.assertIn(datetime.date(2026, 1, 1), lst_days)
+        self.assertIn(datetime.date(2026, 1, 5), lst_days)
+        for day in lst_days:
+            self.assertTrue(day.day in (1, 15) or day.weekday() == 0)
+
+    def test_never_matches(self):
+        with self.assertRaises(ValueError):
+            CronExpression('0 0 31 2 *').next(datetime.datetime(2026, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()